@@ -14,9 +14,161 @@ AVAILABLE_SERVICES = [
     'lightsail'
 ]
 
+# Region planning: regions with these opt-in statuses are audited
+REGION_OPT_IN_STATUSES = ['opt-in-not-required', 'opted-in']
+# Services whose endpoints are listed under another name in botocore's endpoint data
+REGION_ENDPOINT_SERVICES = {
+    'vpc': 'ec2'
+}
+# Errors that mark a (region, service) pair as hopeless until the entry expires. Bad or
+# expired credentials (AuthFailure, UnrecognizedClientException) say nothing about a region.
+REGION_DENIED_ERRORS = ['AccessDenied', 'AccessDeniedException', 'UnauthorizedOperation', 'OptInRequired',
+                        'SubscriptionRequiredException']
+# Region-wide listing calls of each regional service; only their denials mark a pair denied,
+# a denied per-resource lookup may just be one missing optional permission
+REGION_LISTING_OPERATIONS = {
+    'ec2': ['DescribeInstances'],
+    'rds': ['DescribeDBInstances'],
+    'vpc': ['DescribeVpcs'],
+    'lambda': ['ListFunctions'],
+    'dynamodb': ['ListTables'],
+    'bedrock': ['ListFoundationModels'],
+    'emr': ['ListClusters'],
+    'lightsail': ['GetInstances', 'GetRelationalDatabases', 'GetContainerServices']
+}
+REGION_DENIED_TTL = 24 * 3600
+
 # Threading configuration
 DEFAULT_MAX_WORKERS = 10
 
+# Tag keys reported as columns, mapped to their column names
+DEFAULT_TAG_COLUMNS = {
+    'Environment': 'Environment',
+    'Owner': 'Owner',
+    'CostCenter': 'Cost Center'
+}
+
+# Organization mode: one scheduler across all accounts, with a cap on units in flight per account
+ORG_MAX_WORKERS = 64
+ORG_ACCOUNT_CONCURRENCY = 8
+ORG_ROLE_SESSION_NAME = 'aws-resource-auditor'
+ORG_ROLE_DURATION = 3600
+
+# Sharded runs: units are leased from a SQLite queue in the run's checkpoint directory.
+# Workers renew their leases while they run, units of a worker that stops are leased again.
+SHARD_QUEUE_NAME = 'queue.db'
+SHARD_LEASE_SECONDS = 120
+SHARD_POLL_SECONDS = 5
+SHARD_WORKER_THREADS = 8
+
+# boto3 client configuration, max_pool_connections is set from the worker count
+CLIENT_CONFIG = {
+    'connect_timeout': 3,
+    'read_timeout': 20,
+    'tcp_keepalive': True,
+    'retries': {
+        'max_attempts': 5,
+        'mode': 'standard'
+    }
+}
+
+# Circuit breaker: consecutive failures of one class before a region/service pair fails fast
+CIRCUIT_BREAKER_THRESHOLD = 5
+CIRCUIT_BREAKER_RESET_SECONDS = 300
+CIRCUIT_BREAKER_ERROR_CLASSES = {
+    'access_denied': ['AccessDenied', 'AccessDeniedException', 'UnauthorizedOperation',
+                      'AuthFailure', 'OptInRequired', 'UnrecognizedClientException'],
+    'throttling': ['Throttling', 'ThrottlingException', 'TooManyRequestsException',
+                   'RequestLimitExceeded', 'ProvisionedThroughputExceededException'],
+    'server': ['InternalError', 'InternalFailure', 'ServiceUnavailable', 'ServiceUnavailableException']
+}
+
+# Adaptive API rate limits in calls per second per (service, region, operation family).
+# A service maps to one rate or to rates per family (the operation's verb, e.g. List).
+API_RATE_LIMITS = {
+    'default': 100,
+    'iam': 15,
+    'organizations': 8,
+    'lambda': {
+        'Get': 15,
+        'List': 15,
+        'default': 50
+    }
+}
+RATE_LIMIT_MIN_RATE = 0.5
+RATE_LIMIT_DECREASE_FACTOR = 0.5
+RATE_LIMIT_DECREASE_COOLDOWN = 1.0
+RATE_LIMIT_INCREASE_PER_SECOND = 0.5
+
+# IAM collection configuration
+IAM_MODES = ['bulk', 'standard']
+CREDENTIAL_REPORT_POLL_SECONDS = 2
+CREDENTIAL_REPORT_MAX_POLLS = 30
+
+# Lambda enrichment configuration, rates are Lambda's per-account control plane quotas
+LAMBDA_ENRICHMENT_FIELDS = ['policy', 'tags', 'concurrency']
+LAMBDA_ENRICHMENT_WORKERS = 16
+
+# DynamoDB collection configuration, the throttled lane carries the low-limit calls
+DYNAMODB_DESCRIBE_WORKERS = 32
+DYNAMODB_THROTTLED_WORKERS = 4
+DYNAMODB_THROTTLED_RATE = 10
+
+# EMR collection configuration
+EMR_CLUSTER_STATES = ['STARTING', 'BOOTSTRAPPING', 'RUNNING', 'WAITING', 'TERMINATING',
+                      'TERMINATED', 'TERMINATED_WITH_ERRORS']
+EMR_DETAIL_WORKERS = 8
+
+# Bedrock foundation model catalog cache
+BEDROCK_CACHE_TTL = 7 * 24 * 3600
+
+# S3 per-bucket collection configuration
+S3_BUCKET_WORKERS = 32
+
+# S3 bucket metrics configuration
+S3_METRICS_STRATEGIES = ['cloudwatch', 'exact', 'none']
+S3_EXACT_COUNT_WORKERS = 16
+S3_EXACT_COUNT_MAX_OBJECTS = 10_000_000
+
+# On-disk cache configuration, stored under the user's cache directory
+CACHE_DIR_NAME = 'aws-resource-auditor'
+CACHE_MAX_ENTRIES = 5000
+
+# Incremental mode: enrichment that no change marker covers (Lambda permissions and reserved
+# concurrency, DynamoDB point-in-time recovery) is fetched again once its snapshot is this old
+SNAPSHOT_MAX_AGE = 6 * 3600
+
+# Report output configuration
+OUTPUT_FORMATS = ['json', 'excel', 'ndjson', 'parquet', 'sqlite']
+DEFAULT_OUTPUT_FORMATS = ['json', 'excel']
+NDJSON_COMPRESSION = ['none', 'gzip', 'zstd']
+NDJSON_QUEUE_SIZE = 256
+
+# Parquet report configuration
+PARQUET_ROW_GROUP_SIZE = 100_000
+# Columns with a fixed type: timestamps some services render as strings are parsed back,
+# byte counts are written as the raw integers the records hold
+PARQUET_COLUMN_TYPES = {
+    'Launch Time': 'timestamp',
+    'Creation Time': 'timestamp',
+    'End Time': 'timestamp',
+    'Created': 'timestamp',
+    'Created At': 'timestamp',
+    'CreationDate': 'timestamp',
+    'Last Modified': 'timestamp',
+    'PasswordLastUsed': 'timestamp',
+    'Code Size': 'bytes',
+    'Memory': 'bytes',
+    'Storage': 'bytes',
+    'Size': 'bytes'
+}
+
+# SQLite inventory configuration
+SQLITE_DB_NAME = 'aws_inventory.db'
+SQLITE_BATCH_SIZE = 1000
+# Columns indexed in every table that has them, in addition to the tag columns
+SQLITE_INDEX_COLUMNS = ['Region', 'VPC ID', 'ARN']
+
 # Excel report configuration
 EXCEL_FORMATS = {
     'header': {
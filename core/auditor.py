@@ -1,5 +1,6 @@
-from typing import List, Dict, Any
+from typing import Callable, Iterable, List, Dict, Any, Tuple
 import boto3
+from botocore.exceptions import ClientError
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from threading import Lock
 from services.base import AWSService
@@ -14,130 +15,258 @@ from services.s3 import S3Service
 from services.emr import EMRService
 from services.organizations import OrganizationsService
 from services.lightsail import LightsailService
+from services.tagging import TagIndex
+from utils.client_pool import ClientPool
+from utils.circuit_breaker import CircuitBreaker
+from utils.rate_limit import RateLimiter, shared_rate_limiter
+from utils.exceptions import CircuitOpenError
+from utils.snapshot import SnapshotStore
+from config.settings import DEFAULT_MAX_WORKERS
+
+# Pseudo-region used for units that audit global services
+GLOBAL_REGION = 'global'
+
+GLOBAL_SERVICES = {
+    'iam': (IAMService, "Auditing IAM resources..."),
+    's3': (S3Service, "Auditing S3 buckets..."),
+    'organizations': (OrganizationsService, "Auditing Organizations...")
+}
+
+REGIONAL_SERVICES = {
+    'ec2': (EC2Service, "Checking EC2 instances"),
+    'rds': (RDSService, "Checking RDS instances"),
+    'vpc': (VPCService, "Checking VPC resources"),
+    'lambda': (LambdaService, "Checking Lambda functions"),
+    'dynamodb': (DynamoDBService, "Checking DynamoDB tables"),
+    'bedrock': (BedrockService, "Checking Bedrock resources"),
+    'emr': (EMRService, "Checking EMR clusters"),
+    'lightsail': (LightsailService, "Checking Lightsail resources")
+}
+
+def error_details(error: Exception) -> Dict[str, Any]:
+    """Structured fields recorded alongside a failed unit's error message"""
+    details = {'type': type(error).__name__}
+    if isinstance(error, ClientError):
+        details['code'] = error.response.get('Error', {}).get('Code')
+        details['operation'] = error.operation_name
+    elif isinstance(error, CircuitOpenError):
+        details.update({'error_class': error.error_class, 'failures': error.failures})
+    return details
 
 class AWSAuditor:
-    def __init__(self, session: boto3.Session, regions: List[str], services: List[str]):
+    def __init__(self, session: boto3.Session, regions: List[str], services: List[str],
+                 max_workers: int = DEFAULT_MAX_WORKERS, service_options: Dict[str, Dict[str, Any]] = None,
+                 tag_columns: Dict[str, str] = None, snapshot_store: SnapshotStore = None,
+                 client_config: Dict[str, Any] = None, circuit_breaker: CircuitBreaker = None,
+                 rate_limiter: RateLimiter = None, account_id: str = None,
+                 session_factory: Callable[[], boto3.Session] = None):
         self.session = session
         self.regions = regions
         self.services = services
+        self.max_workers = max_workers
+        self.service_options = service_options or {}
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self.rate_limiter = rate_limiter or shared_rate_limiter()
+        # In organization mode every account gets its own auditor, clients and rate buckets
+        self.account_id = account_id
+        self.client_pool = ClientPool(session, max_pool_connections=max_workers,
+                                      session_factory=session_factory, client_config=client_config,
+                                      breaker=self.circuit_breaker, rate_limiter=self.rate_limiter,
+                                      scope=account_id)
+        self.tag_columns = tag_columns
+        self.snapshot_store = snapshot_store
+        self.tag_indexes = {}
         self.print_lock = Lock()
+        self.results_lock = Lock()
         self.results = {
             'regions': {},
-            'global_services': {}
+            'global_services': {},
+            'errors': [],
+            'metrics': {}
         }
+        self._pending_units = {}
+        self._partial_regions = {}
+        self.listeners = []
+        self.restored_units = {}
+        self.rerun_units = None
+        self.excluded_units = set()
 
     def print_progress(self, message):
+        if self.account_id:
+            message = '\n'.join(f"[{self.account_id}] {line}" if line else line
+                                for line in message.split('\n'))
         with self.print_lock:
             print(message)
 
-    def audit_global_services(self) -> Dict[str, Any]:
-        global_results = {}
-        
-        if 'iam' in self.services:
-            self.print_progress("\nAuditing IAM resources...")
-            iam_service = IAMService(self.session)
-            global_results['iam'] = iam_service.audit()
-        
-        if 's3' in self.services:
-            self.print_progress("\nAuditing S3 buckets...")
-            s3_service = S3Service(self.session)
-            global_results['s3'] = s3_service.audit()
-
-        if 'organizations' in self.services:
-            self.print_progress("\nAuditing Organizations...")
-            org_service = OrganizationsService(self.session)
-            global_results['organizations'] = org_service.audit()
-            
-        return global_results
-
-    def run_audit(self, max_workers: int = 10) -> Dict[str, Any]:
+    def plan_units(self) -> List[Tuple[str, str]]:
+        """Return every (region, service) work unit for this audit"""
+        units = [(GLOBAL_REGION, service) for service in GLOBAL_SERVICES
+                 if service in self.services]
+        for region in self.regions:
+            units.extend((region, service) for service in REGIONAL_SERVICES
+                         if service in self.services and ((region, service) not in self.excluded_units
+                                                          or (region, service) in self.restored_units))
+        return units
+
+    def add_listener(self, listener: Callable[..., None]):
+        """Call listener(region, service, result=...) or listener(region, service, error=..., details=...)
+        as each unit finishes"""
+        self.listeners.append(listener)
+
+    def exclude_units(self, units: Iterable[Tuple[str, str]]):
+        """Skip regional units that are known to fail, such as services without an endpoint"""
+        self.excluded_units = set(units)
+
+    def restore_units(self, results: Dict[Tuple[str, str], Any], rerun: Iterable[Tuple[str, str]] = None):
+        """Reuse unit results from a previous run; when rerun is given only those units run again"""
+        self.restored_units = dict(results)
+        self.rerun_units = set(rerun) if rerun is not None else None
+
+    def create_service(self, region: str, service: str) -> AWSService:
+        options = self.service_options.get(service, {})
+        if region == GLOBAL_REGION:
+            service_class = GLOBAL_SERVICES[service][0]
+            return service_class(self.session, client_pool=self.client_pool, tag_columns=self.tag_columns,
+                                 snapshot_store=self.snapshot_store, **options)
+        service_class = REGIONAL_SERVICES[service][0]
+        return service_class(self.session, region, client_pool=self.client_pool,
+                             tag_index=self.get_tag_index(region), tag_columns=self.tag_columns,
+                             snapshot_store=self.snapshot_store, **options)
+
+    def get_tag_index(self, region: str) -> TagIndex:
+        """Return the region's shared tag index, built on first lookup"""
+        with self.results_lock:
+            if region not in self.tag_indexes:
+                self.tag_indexes[region] = TagIndex(self.client_pool, region)
+            return self.tag_indexes[region]
+
+    def run_unit(self, region: str, service: str) -> Any:
+        if region == GLOBAL_REGION:
+            self.print_progress(f"\n{GLOBAL_SERVICES[service][1]}")
+        else:
+            self.print_progress(f"  {REGIONAL_SERVICES[service][1]} in {region}...")
+        return self.create_service(region, service).audit()
+
+    def run_audit(self, max_workers: int = None) -> Dict[str, Any]:
+        max_workers = max_workers or self.max_workers
         self.print_progress(f"\nAuditing {len(self.regions)} regions: {', '.join(self.regions)}")
         self.print_progress(f"Starting AWS resource audit...")
         self.print_progress(f"Services to audit: {', '.join(self.services)}\n")
-        
-        self.results['global_services'] = self.audit_global_services()
-        processed_regions = 0
+
+        units = self.begin_run()
 
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_region = {
-                executor.submit(self.audit_region, region): region 
-                for region in self.regions
+            future_to_unit = {
+                executor.submit(self.run_unit, region, service): (region, service)
+                for region, service in units
             }
-            
-            for future in as_completed(future_to_region):
-                region = future_to_region[future]
+
+            for future in as_completed(future_to_unit):
+                region, service = future_to_unit[future]
                 try:
-                    result = future.result()
-                    self.results['regions'][region] = result
-                    processed_regions += 1
-                    
-                    if result:
-                        self.print_progress(f"\nResources found in {region}:")
-                        self.print_progress(f"    EC2 instances: {len(result.get('ec2', []))}")
-                        self.print_progress(f"    RDS instances: {len(result.get('rds', []))}")
-                        self.print_progress(f"    VPC resources: {len(result.get('vpc', []))}")
-                        self.print_progress(f"    Lambda functions: {len(result.get('lambda', []))}")
-                        self.print_progress(f"    DynamoDB tables: {len(result.get('dynamodb', []))}")
-                        self.print_progress(f"    Bedrock models: {len(result.get('bedrock', []))}")
-                        self.print_progress(f"    EMR clusters: {len(result.get('emr', []))}")
-                        self.print_progress(f"Successfully processed region: {region}")
-                    
-                    self.print_progress(f"\nProgress: {processed_regions}/{len(self.regions)} regions processed")
-                    
+                    self.record_result(region, service, future.result())
                 except Exception as e:
-                    self.print_progress(f"Unexpected error processing region {region}: {str(e)}")
-                    self.results['regions'][region] = {'error': str(e)}
-                    
+                    self.print_progress(f"Unexpected error auditing {service} in {region}: {str(e)}")
+                    self.record_error(region, service, str(e), error_details(e))
+
+        return self.finish_run()
+
+    def begin_run(self) -> List[Tuple[str, str]]:
+        """Reset per-region bookkeeping and return the units that still have to run"""
+        units = [unit for unit in self.plan_units()
+                 if unit in self.restored_units or self.rerun_units is None or unit in self.rerun_units]
+        self._pending_units = {}
+        self._partial_regions = {}
+        for region, _ in units:
+            if region != GLOBAL_REGION:
+                self._pending_units[region] = self._pending_units.get(region, 0) + 1
+
+        # Regions with no regional services still show up in the results
+        for region in self.regions:
+            if region not in self._pending_units:
+                self.results['regions'][region] = {}
+
+        pending = []
+        for region, service in units:
+            if (region, service) in self.restored_units:
+                self.record_result(region, service, self.restored_units[(region, service)])
+            else:
+                pending.append((region, service))
+        if self.restored_units:
+            self.print_progress(f"Restored {len(units) - len(pending)} units, {len(pending)} left to run")
+        return pending
+
+    def finish_run(self) -> Dict[str, Any]:
+        global_results = self.results['global_services']
+        self.results['global_services'] = {
+            service: global_results[service] for service in GLOBAL_SERVICES
+            if service in global_results
+        }
+        rate_limits = self.rate_limiter.metrics(scope=self.account_id)
+        self.results['metrics']['rate_limits'] = rate_limits
+        throttled = [limit for limit in rate_limits if limit['throttles']]
+        if throttled:
+            self.print_progress(f"\nThrottled API families: " + ', '.join(
+                f"{limit['service']} {limit['family']} in {limit['region']} ({limit['rate']}/s)"
+                for limit in throttled))
         return self.results
 
-    def audit_region(self, region: str) -> Dict[str, Any]:
-        self.print_progress(f"\nProcessing region: {region}")
-        self.print_progress(f"\nAuditing region: {region}")
-        regional_results = {}
-        
-        try:
-            if 'ec2' in self.services:
-                self.print_progress("  Checking EC2 instances...")
-                ec2_service = EC2Service(self.session, region)
-                regional_results['ec2'] = ec2_service.audit()
-
-            if 'rds' in self.services:
-                self.print_progress("  Checking RDS instances...")
-                rds_service = RDSService(self.session, region)
-                regional_results['rds'] = rds_service.audit()
-
-            if 'vpc' in self.services:
-                self.print_progress("  Checking VPC resources...")
-                vpc_service = VPCService(self.session, region)
-                regional_results['vpc'] = vpc_service.audit()
-
-            if 'lambda' in self.services:
-                self.print_progress("  Checking Lambda functions...")
-                lambda_service = LambdaService(self.session, region)
-                regional_results['lambda'] = lambda_service.audit()
-
-            if 'dynamodb' in self.services:
-                self.print_progress("  Checking DynamoDB tables...")
-                dynamodb_service = DynamoDBService(self.session, region)
-                regional_results['dynamodb'] = dynamodb_service.audit()
-
-            if 'bedrock' in self.services:
-                self.print_progress("  Checking Bedrock resources...")
-                bedrock_service = BedrockService(self.session, region)
-                regional_results['bedrock'] = bedrock_service.audit()
-
-            if 'emr' in self.services:
-                self.print_progress("  Checking EMR clusters...")
-                emr_service = EMRService(self.session, region)
-                regional_results['emr'] = emr_service.audit()
-                
-            if 'lightsail' in self.services:
-                self.print_progress("  Checking Lightsail resources...")
-                lightsail_service = LightsailService(self.session, region)
-                regional_results['lightsail'] = lightsail_service.audit()
-
-            return regional_results
-            
-        except Exception as e:
-            print(f"Error in region {region}: {str(e)}")
-            return {'error': str(e)}
\ No newline at end of file
+    def record_result(self, region: str, service: str, result: Any):
+        """Store the result of one finished unit, assembling its region when complete"""
+        with self.results_lock:
+            if region == GLOBAL_REGION:
+                self.results['global_services'][service] = result
+            else:
+                self._partial_regions.setdefault(region, {})[service] = result
+                self._unit_done(region)
+        self._notify(region, service, result=result)
+
+    def record_error(self, region: str, service: str, error: str, details: Dict[str, Any] = None):
+        with self.results_lock:
+            self.results['errors'].append({'region': region, 'service': service, 'error': error,
+                                           **(details or {})})
+            if region == GLOBAL_REGION:
+                self.results['global_services'][service] = {'error': error}
+            else:
+                partial = self._partial_regions.setdefault(region, {})
+                partial['error'] = f"{partial['error']}; {service}: {error}" if 'error' in partial else f"{service}: {error}"
+                self._unit_done(region)
+        self._notify(region, service, error=error, details=details or {})
+
+    def _notify(self, region: str, service: str, **outcome):
+        for listener in self.listeners:
+            try:
+                listener(region, service, **outcome)
+            except Exception as e:
+                self.print_progress(f"Error handling result of {service} in {region}: {str(e)}")
+
+    def _unit_done(self, region: str):
+        self._pending_units[region] -= 1
+        if self._pending_units[region] > 0:
+            return
+
+        partial = self._partial_regions.pop(region, {})
+        regional_results = {
+            service: partial[service] for service in REGIONAL_SERVICES
+            if service in partial
+        }
+        if 'error' in partial:
+            regional_results['error'] = partial['error']
+        self.results['regions'][region] = regional_results
+        self._print_region_summary(region, regional_results)
+
+    def _print_region_summary(self, region: str, result: Dict[str, Any]):
+        processed_regions = len(self.results['regions'])
+        if result:
+            self.print_progress(f"\nResources found in {region}:")
+            self.print_progress(f"    EC2 instances: {len(result.get('ec2', []))}")
+            self.print_progress(f"    RDS instances: {len(result.get('rds', []))}")
+            self.print_progress(f"    VPC resources: {len(result.get('vpc', []))}")
+            self.print_progress(f"    Lambda functions: {len(result.get('lambda', []))}")
+            self.print_progress(f"    DynamoDB tables: {len(result.get('dynamodb', []))}")
+            self.print_progress(f"    Bedrock models: {len(result.get('bedrock', []))}")
+            self.print_progress(f"    EMR clusters: {len(result.get('emr', []))}")
+            if 'error' not in result:
+                self.print_progress(f"Successfully processed region: {region}")
+
+        self.print_progress(f"\nProgress: {processed_regions}/{len(self.regions)} regions processed")
@@ -0,0 +1,79 @@
+from typing import Dict, Any, List, Tuple
+from datetime import datetime
+import json
+import os
+import tempfile
+from services.records import raw_json_default, raw_json_hook
+
+class CheckpointStore:
+    """Writes every finished (region, service) unit to disk so an interrupted audit can be resumed
+
+    Records are stored with their raw values and rebuilt on load, so restored units reach the
+    typed writers (Parquet, SQLite) exactly as freshly collected ones.
+    """
+
+    def __init__(self, directory: str, run_id: str):
+        self.run_id = run_id
+        self.run_dir = os.path.join(directory, run_id)
+
+    @staticmethod
+    def new_run_id() -> str:
+        return datetime.now().strftime('%Y%m%d_%H%M%S')
+
+    def exists(self) -> bool:
+        return os.path.exists(os.path.join(self.run_dir, 'manifest.json'))
+
+    def save_manifest(self, regions: List[str], services: List[str], **extra: Any):
+        self._write_json('manifest.json', {
+            'run_id': self.run_id,
+            'created': datetime.now().isoformat(),
+            'regions': regions,
+            'services': services,
+            **extra
+        })
+
+    def load_manifest(self) -> Dict[str, Any]:
+        with open(os.path.join(self.run_dir, 'manifest.json')) as f:
+            return json.load(f)
+
+    def save_unit(self, region: str, service: str, result: Any = None, error: str = None,
+                  details: Dict[str, Any] = None):
+        """Atomically record the outcome of one unit"""
+        data = {'region': region, 'service': service}
+        if error is not None:
+            data['error'] = error
+            data['details'] = details or {}
+        else:
+            data['result'] = result
+        self._write_json(self._unit_file(region, service), data)
+
+    def load_units(self) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        units = {}
+        for name in os.listdir(self.run_dir):
+            if not name.startswith('unit__') or not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.run_dir, name)) as f:
+                    data = json.load(f, object_hook=raw_json_hook)
+            except (OSError, ValueError):
+                # A unit that cannot be read is treated as missing and runs again
+                continue
+            units[(data['region'], data['service'])] = data
+        return units
+
+    def _unit_file(self, region: str, service: str) -> str:
+        return f"unit__{region}__{service}.json"
+
+    def _write_json(self, name: str, data: Dict[str, Any]):
+        os.makedirs(self.run_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.run_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f, default=raw_json_default)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, os.path.join(self.run_dir, name))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
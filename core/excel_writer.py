@@ -0,0 +1,97 @@
+from typing import Any, Callable, Dict, Iterable, List
+from datetime import date, datetime
+import math
+import xlsxwriter
+from services.records import display_items
+
+# Excel's hard row limit, including the header row
+MAX_EXCEL_ROWS = 1048576
+MAX_SHEET_NAME = 31
+MAX_COLUMN_WIDTH = 60
+
+class StreamingExcelWriter:
+    """Writes rows straight into an xlsxwriter workbook in constant_memory mode"""
+
+    def __init__(self, path: str, header_format: Dict[str, Any], max_rows: int = MAX_EXCEL_ROWS):
+        self.workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
+        self.header_format = self.workbook.add_format(header_format)
+        self.max_rows = max_rows
+
+    def close(self):
+        self.workbook.close()
+
+    def write_sheet(self, sheet_name: str, rows: Callable[[], Iterable[Dict[str, Any]]]) -> int:
+        """Write the rows produced by `rows` to one or more sheets and return the row count
+
+        `rows` is called twice: once to collect the columns and once to write the cells,
+        so no row has to be held in memory.
+        """
+        columns = self._collect_columns(rows())
+        if not columns:
+            return 0
+
+        column_index = {column: idx for idx, column in enumerate(columns)}
+        worksheet, widths, part = None, None, 0
+        written = 0
+        row_number = self.max_rows
+        for row in rows():
+            if row_number >= self.max_rows:
+                if worksheet is not None:
+                    self._set_widths(worksheet, widths)
+                part += 1
+                worksheet, widths = self._add_worksheet(sheet_name, part, columns)
+                row_number = 1
+
+            for column, value in display_items(row):
+                idx = column_index[column]
+                width = self._write_cell(worksheet, row_number, idx, value)
+                if width > widths[idx]:
+                    widths[idx] = min(width, MAX_COLUMN_WIDTH)
+            row_number += 1
+            written += 1
+
+        self._set_widths(worksheet, widths)
+        print(f"  Added {written} {sheet_name}")
+        return written
+
+    def _collect_columns(self, rows: Iterable[Dict[str, Any]]) -> List[str]:
+        columns = {}
+        for row in rows:
+            for column in row:
+                if column not in columns:
+                    columns[column] = None
+        return list(columns)
+
+    def _add_worksheet(self, sheet_name: str, part: int, columns: List[str]):
+        if part > 1:
+            suffix = f" ({part})"
+            sheet_name = sheet_name[:MAX_SHEET_NAME - len(suffix)] + suffix
+        worksheet = self.workbook.add_worksheet(sheet_name[:MAX_SHEET_NAME])
+        widths = []
+        for idx, column in enumerate(columns):
+            worksheet.write_string(0, idx, str(column), self.header_format)
+            widths.append(len(str(column)) + 2)
+        return worksheet, widths
+
+    def _set_widths(self, worksheet, widths: List[int]):
+        for idx, width in enumerate(widths):
+            worksheet.set_column(idx, idx, width)
+
+    def _write_cell(self, worksheet, row: int, col: int, value: Any) -> int:
+        """Write one cell and return the width it needs"""
+        if value is None:
+            return 0
+        if isinstance(value, bool):
+            worksheet.write_boolean(row, col, value)
+            return 5
+        if isinstance(value, (int, float)):
+            if isinstance(value, float) and not math.isfinite(value):
+                return 0
+            worksheet.write_number(row, col, value)
+            return len(str(value))
+        if isinstance(value, (datetime, date)):
+            value = str(value)
+        elif not isinstance(value, str):
+            value = str(value)
+        worksheet.write_string(row, col, value)
+        return len(value)
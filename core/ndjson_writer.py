@@ -0,0 +1,90 @@
+from typing import Any, Callable, Dict, Iterator, Tuple
+from queue import Queue
+from threading import Thread
+import gzip
+import io
+import json
+from config.settings import NDJSON_QUEUE_SIZE
+from services.records import json_default
+from utils.exceptions import ReportGenerationError
+
+COMPRESSION_SUFFIXES = {
+    'none': '',
+    'gzip': '.gz',
+    'zstd': '.zst'
+}
+
+class NDJSONWriter:
+    """Appends one JSON line per resource from a background thread as audit units finish"""
+
+    def __init__(self, path: str, compression: str = 'none'):
+        self.path = path + COMPRESSION_SUFFIXES[compression]
+        self.compression = compression
+        self.lines_written = 0
+        self._queue = Queue(maxsize=NDJSON_QUEUE_SIZE)
+        self._stream = self._open()
+        self._thread = Thread(target=self._run, name='ndjson-writer', daemon=True)
+        self._thread.start()
+
+    def listener(self, account_id: str) -> Callable[..., None]:
+        """Return an auditor listener that tags every line with the account"""
+        def on_unit(region: str, service: str, result: Any = None, error: str = None,
+                    details: Dict[str, Any] = None):
+            self._queue.put((account_id, region, service, result, error, details))
+        return on_unit
+
+    def close(self) -> str:
+        self._queue.put(None)
+        self._thread.join()
+        self._stream.close()
+        return self.path
+
+    def _open(self) -> io.TextIOBase:
+        if self.compression == 'gzip':
+            # Each flush ends a deflate block, so readers can decompress what has been written so far
+            return gzip.open(self.path, 'wt', encoding='utf-8')
+        if self.compression == 'zstd':
+            try:
+                import zstandard
+            except ImportError:
+                raise ReportGenerationError("zstd compression requires the zstandard package")
+            raw = open(self.path, 'wb')
+            return io.TextIOWrapper(zstandard.ZstdCompressor().stream_writer(raw), encoding='utf-8')
+        return open(self.path, 'w', encoding='utf-8')
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            account_id, region, service, result, error, details = item
+            try:
+                for line in self._lines(account_id, region, service, result, error, details):
+                    self._stream.write(line)
+                    self._stream.write('\n')
+                    self.lines_written += 1
+                self._stream.flush()
+            except Exception as e:
+                print(f"Error writing NDJSON lines for {service} in {region}: {str(e)}")
+
+    def _lines(self, account_id: str, region: str, service: str, result: Any, error: str,
+               details: Dict[str, Any]) -> Iterator[str]:
+        base = {'account': account_id, 'region': region, 'service': service}
+        if error is not None:
+            yield json.dumps({**base, 'error': error, **(details or {})}, default=json_default, separators=(',', ':'))
+            return
+        for resource_type, resource in self._resources(service, result):
+            yield json.dumps({**base, 'resource_type': resource_type, 'resource': resource},
+                             default=json_default, separators=(',', ':'))
+
+    def _resources(self, service: str, result: Any) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        if isinstance(result, list):
+            for resource in result:
+                yield service, resource
+        elif isinstance(result, dict):
+            for key, value in result.items():
+                if isinstance(value, list):
+                    for resource in value:
+                        yield f"{service}.{key}", resource
+                elif isinstance(value, dict):
+                    yield f"{service}.{key}", value
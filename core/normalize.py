@@ -0,0 +1,166 @@
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+from services.records import Record
+
+Row = Dict[str, Any]
+Flattener = Callable[[Row], Iterator[Tuple[str, Row]]]
+
+# Table order used by every writer: global tables first, then the regional ones
+GLOBAL_TABLES = ['IAM Users', 'IAM Roles', 'IAM Groups', 'S3 Buckets',
+                 'Organization Accounts', 'Organization Policies']
+REGIONAL_TABLES = ['EC2 Instances', 'RDS Instances', 'VPCs', 'Subnets', 'Internet Gateways',
+                   'NAT Gateways', 'Routes', 'Security Groups', 'Security Group Rules',
+                   'Lambda Functions', 'DynamoDB Tables', 'Bedrock Models', 'Config Services',
+                   'EMR Clusters', 'EMR Steps', 'EMR Instance Groups', 'Lightsail Instances',
+                   'Lightsail Databases', 'Lightsail Containers']
+
+VPC_NESTED_TABLES = {
+    'subnets': 'Subnets',
+    'internet_gateways': 'Internet Gateways',
+    'nat_gateways': 'NAT Gateways',
+    'route_tables': 'Routes',
+    'security_groups': 'Security Groups',
+    'security_group_rules': 'Security Group Rules'
+}
+EMR_NESTED_TABLES = {
+    'Steps': 'EMR Steps',
+    'Instance Groups': 'EMR Instance Groups'
+}
+LIGHTSAIL_TABLES = {
+    'Instance': 'Lightsail Instances',
+    'Database': 'Lightsail Databases',
+    'Container': 'Lightsail Containers'
+}
+
+def _table(name: str) -> Flattener:
+    def flatten(resource: Row) -> Iterator[Tuple[str, Row]]:
+        yield name, resource
+    return flatten
+
+def _scalars(resource: Row) -> Row:
+    return {k: v for k, v in resource.items() if not isinstance(v, (list, dict))}
+
+def _flatten_vpc(vpc: Row) -> Iterator[Tuple[str, Row]]:
+    yield 'VPCs', _scalars(vpc)
+    for key, table in VPC_NESTED_TABLES.items():
+        for row in vpc.get(key, []):
+            yield table, row
+
+def _flatten_emr(cluster: Row) -> Iterator[Tuple[str, Row]]:
+    yield 'EMR Clusters', _scalars(cluster)
+    for key, table in EMR_NESTED_TABLES.items():
+        for row in cluster.get(key) or []:
+            yield table, {**row, 'Cluster ID': cluster['Cluster ID'], 'Cluster Name': cluster['Name']}
+
+def _flatten_lightsail(resource: Row) -> Iterator[Tuple[str, Row]]:
+    table = LIGHTSAIL_TABLES.get(resource.get('Resource Type'))
+    if table:
+        yield table, resource
+
+# Routes each resource of a regional service to the tables it belongs in
+REGIONAL_FLATTENERS: Dict[str, Flattener] = {
+    'ec2': _table('EC2 Instances'),
+    'rds': _table('RDS Instances'),
+    'vpc': _flatten_vpc,
+    'lambda': _table('Lambda Functions'),
+    'dynamodb': _table('DynamoDB Tables'),
+    'bedrock': _table('Bedrock Models'),
+    'config': _table('Config Services'),
+    'emr': _flatten_emr,
+    'lightsail': _flatten_lightsail
+}
+
+# Global services return dicts of resource lists; each key maps to its own table
+GLOBAL_FLATTENERS: Dict[str, Dict[str, str]] = {
+    'iam': {'users': 'IAM Users', 'roles': 'IAM Roles', 'groups': 'IAM Groups'},
+    'organizations': {'accounts': 'Organization Accounts', 'policies': 'Organization Policies'}
+}
+GLOBAL_LIST_TABLES = {
+    's3': 'S3 Buckets'
+}
+
+class NormalizedResults:
+    """Audit results routed into report tables, plus the counts the summary sheets need
+
+    Region counts and errors are keyed by (account, region); the account is None unless the
+    results come from an organization audit, where every row is a copy with an Account column.
+    """
+
+    def __init__(self):
+        self.tables: Dict[str, List[Row]] = {name: [] for name in GLOBAL_TABLES + REGIONAL_TABLES}
+        self.region_counts: Dict[Tuple[Optional[str], str], Dict[str, int]] = {}
+        self.region_errors: Dict[Tuple[Optional[str], str], str] = {}
+        self.global_counts: Dict[str, int] = {}
+        self.accounts: Dict[str, Row] = {}
+        self.services: Set[str] = set()
+
+    def total(self, service: str) -> int:
+        return sum(counts.get(service, 0) for counts in self.region_counts.values())
+
+    def regions(self) -> List[str]:
+        """Audited regions in the order they were first seen"""
+        return list(dict.fromkeys(region for _, region in self.region_counts))
+
+def normalize(results: Dict[str, Any]) -> NormalizedResults:
+    """Walk the audit results once, routing every resource to its table and counting as it goes"""
+    normalized = NormalizedResults()
+    if 'accounts' not in results:
+        _normalize_account(normalized, results, None)
+        return normalized
+
+    for account_id, account_results in results['accounts'].items():
+        account = account_results.get('account', {})
+        normalized.accounts[account_id] = {
+            'Account ID': account_id,
+            'Name': account.get('Name'),
+            'Regions': len(account_results.get('regions', {})),
+            'Error': account_results.get('error')
+        }
+        _normalize_account(normalized, account_results, account_id)
+    if results.get('organization'):
+        _normalize_global(normalized, 'organizations', results['organization'], None)
+    return normalized
+
+def _normalize_account(normalized: NormalizedResults, results: Dict[str, Any], account_id: Optional[str]):
+    for service, data in results.get('global_services', {}).items():
+        _normalize_global(normalized, service, data, account_id)
+
+    tables = normalized.tables
+    for region, region_data in results.get('regions', {}).items():
+        counts = normalized.region_counts.setdefault((account_id, region), {})
+        if 'error' in region_data:
+            normalized.region_errors[(account_id, region)] = region_data['error']
+        for service, data in region_data.items():
+            if service != 'error':
+                normalized.services.add(service)
+            if not isinstance(data, list):
+                continue
+            counts[service] = len(data)
+            flatten = REGIONAL_FLATTENERS.get(service)
+            if flatten is None:
+                continue
+            for resource in data:
+                for table, row in flatten(resource):
+                    tables[table].append(row if account_id is None else _with_account(row, account_id))
+
+def _normalize_global(normalized: NormalizedResults, service: str, data: Any, account_id: Optional[str]):
+    normalized.services.add(service)
+    if service in GLOBAL_LIST_TABLES:
+        if isinstance(data, list):
+            _extend(normalized, GLOBAL_LIST_TABLES[service], service, data, account_id)
+    elif service in GLOBAL_FLATTENERS and isinstance(data, dict):
+        for key, table in GLOBAL_FLATTENERS[service].items():
+            if isinstance(data.get(key), list):
+                _extend(normalized, table, f'{service}.{key}', data[key], account_id)
+
+def _extend(normalized: NormalizedResults, table: str, count_key: str, rows: List[Row],
+            account_id: Optional[str]):
+    if account_id is not None:
+        rows = [_with_account(row, account_id) for row in rows]
+    normalized.tables[table].extend(rows)
+    normalized.global_counts[count_key] = normalized.global_counts.get(count_key, 0) + len(rows)
+
+def _with_account(row: Row, account_id: str) -> Row:
+    """Shallow copy of a row, of the same record type, with the Account column added"""
+    copy = type(row)(row) if isinstance(row, Record) else dict(row)
+    copy['Account'] = account_id
+    return copy
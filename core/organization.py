@@ -0,0 +1,198 @@
+from typing import Any, Callable, Deque, Dict, List, Tuple
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from threading import Lock
+import boto3
+import botocore.session
+from botocore.credentials import AssumeRoleCredentialFetcher, DeferredRefreshableCredentials
+from core.auditor import AWSAuditor, error_details
+from core.regions import RegionPlanner
+from services.organizations import OrganizationsService
+from utils.circuit_breaker import CircuitBreaker
+from config.settings import (CIRCUIT_BREAKER_THRESHOLD, ORG_ACCOUNT_CONCURRENCY, ORG_MAX_WORKERS,
+                             ORG_ROLE_DURATION, ORG_ROLE_SESSION_NAME)
+
+class AssumedRoleSessions:
+    """Sessions for member accounts, backed by one cached AssumeRole credential per account
+
+    The credentials are fetched on first use and refreshed by botocore shortly before they
+    expire, so every client of an account shares a single STS session however long the run.
+    """
+
+    def __init__(self, session: boto3.Session, role_name: str, partition: str = 'aws',
+                 session_name: str = ORG_ROLE_SESSION_NAME, duration: int = ORG_ROLE_DURATION):
+        self.session = session
+        self.role_name = role_name
+        self.partition = partition
+        self.session_name = session_name
+        self.duration = duration
+        self._credentials: Dict[str, DeferredRefreshableCredentials] = {}
+        self._lock = Lock()
+
+    def role_arn(self, account_id: str) -> str:
+        return f"arn:{self.partition}:iam::{account_id}:role/{self.role_name}"
+
+    def credentials(self, account_id: str) -> DeferredRefreshableCredentials:
+        with self._lock:
+            credentials = self._credentials.get(account_id)
+            if credentials is None:
+                fetcher = AssumeRoleCredentialFetcher(
+                    client_creator=self._sts_client,
+                    source_credentials=self.session.get_credentials(),
+                    role_arn=self.role_arn(account_id),
+                    extra_args={'RoleSessionName': self.session_name, 'DurationSeconds': self.duration}
+                )
+                credentials = DeferredRefreshableCredentials(refresh_using=fetcher.fetch_credentials,
+                                                             method='assume-role')
+                self._credentials[account_id] = credentials
+            return credentials
+
+    def session_for(self, account_id: str) -> boto3.Session:
+        """A new session for the account; sessions are cheap, the credentials are shared"""
+        botocore_session = botocore.session.Session()
+        botocore_session._credentials = self.credentials(account_id)
+        return boto3.Session(botocore_session=botocore_session, region_name=self.session.region_name)
+
+    def session_factory(self, account_id: str) -> Callable[[], boto3.Session]:
+        """Per-thread session factory for the account's client pool"""
+        return lambda: self.session_for(account_id)
+
+    def _sts_client(self, *args, **kwargs):
+        # Refreshes can run on any worker thread, so each one gets its own session
+        return boto3.Session(region_name=self.session.region_name).client(*args, **kwargs)
+
+class OrganizationAuditor:
+    """Audits every active account of an AWS Organization through a role assumed in each
+
+    Units of all accounts share one thread pool. They are submitted round-robin with a cap
+    on the units in flight per account, so one large account neither starves the others nor
+    exhausts its own API limits.
+    """
+
+    def __init__(self, session: boto3.Session, role_name: str, regions: List[str], services: List[str],
+                 max_workers: int = ORG_MAX_WORKERS, account_concurrency: int = ORG_ACCOUNT_CONCURRENCY,
+                 breaker_threshold: int = CIRCUIT_BREAKER_THRESHOLD, retry_denied: bool = False,
+                 auditor_options: Dict[str, Any] = None):
+        self.session = session
+        self.role_name = role_name
+        self.regions = regions
+        # The organization itself is read once from the management account
+        self.services = [service for service in services if service != 'organizations']
+        self.max_workers = max_workers
+        self.account_concurrency = account_concurrency
+        self.breaker_threshold = breaker_threshold
+        self.retry_denied = retry_denied
+        self.auditor_options = auditor_options or {}
+        self.listener_factories = []
+        self.results = {'organization': None, 'accounts': {}}
+
+    def add_listener(self, factory: Callable[[str], Callable[..., None]]):
+        """Register factory(account_id) returning the auditor listener for that account"""
+        self.listener_factories.append(factory)
+
+    def connect(self):
+        """Identify the management account and set up the member account sessions"""
+        identity = self.session.client('sts').get_caller_identity()
+        self.caller_account = identity['Account']
+        self.sessions = AssumedRoleSessions(self.session, self.role_name,
+                                            partition=identity['Arn'].split(':')[1])
+
+    def account_session(self, account_id: str) -> Tuple[boto3.Session, Callable[[], boto3.Session]]:
+        """Session and per-thread session factory for an account; the management account uses ours"""
+        if account_id == self.caller_account:
+            return self.session, None
+        return self.sessions.session_for(account_id), self.sessions.session_factory(account_id)
+
+    def prepare(self) -> Dict[str, AWSAuditor]:
+        """Read the organization and build the auditor of every account the role works in"""
+        self.connect()
+        print("\nReading the organization's accounts...")
+        organization = OrganizationsService(self.session)._audit_organization()
+        self.results['organization'] = organization
+        accounts = [account for account in organization['accounts'] if account.get('Status') == 'ACTIVE']
+        print(f"Auditing {len(accounts)} active accounts as role {self.role_name}")
+        print(f"Services to audit: {', '.join(self.services)}\n")
+        return self._prepare_accounts(accounts)
+
+    def run_audit(self) -> Dict[str, Any]:
+        auditors = self.prepare()
+        self._schedule(auditors)
+        return self.finish(auditors)
+
+    def finish(self, auditors: Dict[str, AWSAuditor]) -> Dict[str, Any]:
+        for account_id, auditor in auditors.items():
+            self.results['accounts'][account_id].update(auditor.finish_run())
+        failed = [account_id for account_id, data in self.results['accounts'].items() if 'error' in data]
+        print(f"\nAudited {len(auditors)} of {len(self.results['accounts'])} accounts"
+              + (f", skipped {', '.join(failed)}" if failed else ""))
+        return self.results
+
+    def _prepare_accounts(self, accounts: List[Dict[str, Any]]) -> Dict[str, AWSAuditor]:
+        """Assume the role in every account in parallel; accounts where it fails are skipped"""
+        auditors = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self._account_auditor, account['Id']): account
+                       for account in accounts}
+            for future, account in futures.items():
+                account_id = account['Id']
+                self.results['accounts'][account_id] = {
+                    'account': {'Id': account_id, 'Name': account.get('Name')}
+                }
+                try:
+                    auditors[account_id] = future.result()
+                except Exception as e:
+                    print(f"Skipping account {account_id}: {str(e)}")
+                    self.results['accounts'][account_id]['error'] = str(e)
+        return auditors
+
+    def _account_auditor(self, account_id: str) -> AWSAuditor:
+        session, session_factory = self.account_session(account_id)
+        if session_factory is not None:
+            # Assumes the role now, so a missing or untrusted role fails before any unit is planned
+            session.client('sts').get_caller_identity()
+
+        planner = RegionPlanner(session, scope=account_id, retry_denied=self.retry_denied)
+        enabled = set(planner.enabled_regions())
+        regions = [region for region in self.regions if region in enabled]
+        auditor = AWSAuditor(session, regions, self.services, max_workers=self.account_concurrency,
+                             circuit_breaker=CircuitBreaker(threshold=self.breaker_threshold),
+                             account_id=account_id, session_factory=session_factory,
+                             **self.auditor_options)
+        auditor.exclude_units(planner.excluded_units(regions, self.services))
+        auditor.add_listener(planner.record_unit)
+        for factory in self.listener_factories:
+            auditor.add_listener(factory(account_id))
+        auditor.print_progress(f"Auditing {len(regions)} regions: {', '.join(regions)}")
+        return auditor
+
+    def _schedule(self, auditors: Dict[str, AWSAuditor]):
+        queues: Dict[str, Deque[Tuple[str, str]]] = {
+            account_id: deque(auditor.begin_run()) for account_id, auditor in auditors.items()
+        }
+        in_flight = {account_id: 0 for account_id in auditors}
+        futures = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while futures or any(queues.values()):
+                submitted = True
+                while submitted and len(futures) < self.max_workers:
+                    submitted = False
+                    for account_id, queue in queues.items():
+                        if (queue and in_flight[account_id] < self.account_concurrency
+                                and len(futures) < self.max_workers):
+                            region, service = queue.popleft()
+                            future = executor.submit(auditors[account_id].run_unit, region, service)
+                            futures[future] = (account_id, region, service)
+                            in_flight[account_id] += 1
+                            submitted = True
+
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    account_id, region, service = futures.pop(future)
+                    in_flight[account_id] -= 1
+                    auditor = auditors[account_id]
+                    try:
+                        auditor.record_result(region, service, future.result())
+                    except Exception as e:
+                        auditor.print_progress(f"Unexpected error auditing {service} in {region}: {str(e)}")
+                        auditor.record_error(region, service, str(e), error_details(e))
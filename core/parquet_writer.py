@@ -0,0 +1,165 @@
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+from datetime import date, datetime, timezone
+import json
+import os
+import re
+from config.settings import PARQUET_COLUMN_TYPES, PARQUET_ROW_GROUP_SIZE
+from utils.exceptions import ReportGenerationError
+
+PARTITION_COLUMN = 'Region'
+# Rows without a region (global services) land in this partition
+DEFAULT_PARTITION = 'global'
+
+class ParquetReportWriter:
+    """Writes one typed Parquet table per resource type, optionally partitioned by region"""
+
+    def __init__(self, directory: str, row_group_size: int = PARQUET_ROW_GROUP_SIZE,
+                 partition_by_region: bool = False, column_types: Dict[str, str] = None):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ReportGenerationError("Parquet output requires the pyarrow package")
+        self.pa = pyarrow
+        self.pq = pyarrow.parquet
+        self.directory = directory
+        self.row_group_size = row_group_size
+        self.partition_by_region = partition_by_region
+        self.column_types = PARQUET_COLUMN_TYPES if column_types is None else column_types
+        os.makedirs(directory, exist_ok=True)
+
+    def write_table(self, table_name: str, rows: Callable[[], Iterable[Dict[str, Any]]]) -> int:
+        """Write the rows produced by `rows` to one table and return the row count
+
+        Like the Excel writer, `rows` is called twice: once to work out the schema and once
+        to write the row groups.
+        """
+        kinds = self._collect_kinds(rows())
+        if not kinds:
+            return 0
+
+        columns = [column for column in kinds
+                   if not (self.partition_by_region and column == PARTITION_COLUMN)]
+        schema = self.pa.schema([(column, self._arrow_type(kinds[column])) for column in columns])
+        converters = [(column, self._converter(kinds[column])) for column in columns]
+
+        writers, buffers = {}, {}
+        written = 0
+        try:
+            for row in rows():
+                partition = self._partition(row)
+                buffer = buffers.setdefault(partition, [])
+                buffer.append(row)
+                if len(buffer) >= self.row_group_size:
+                    self._flush(table_name, partition, buffer, schema, converters, writers)
+                    buffers[partition] = []
+                written += 1
+            for partition, buffer in buffers.items():
+                if buffer:
+                    self._flush(table_name, partition, buffer, schema, converters, writers)
+        finally:
+            for writer in writers.values():
+                writer.close()
+
+        print(f"  Added {written} {table_name}")
+        return written
+
+    def _partition(self, row: Dict[str, Any]) -> str:
+        if not self.partition_by_region:
+            return None
+        return row.get(PARTITION_COLUMN) or DEFAULT_PARTITION
+
+    def _path(self, table_name: str, partition: str) -> str:
+        name = table_slug(table_name)
+        if partition is None:
+            return os.path.join(self.directory, f'{name}.parquet')
+        # Hive-style layout so query engines can prune whole regions
+        partition_dir = os.path.join(self.directory, name, f'{PARTITION_COLUMN}={partition}')
+        os.makedirs(partition_dir, exist_ok=True)
+        return os.path.join(partition_dir, 'part-0.parquet')
+
+    def _flush(self, table_name: str, partition: str, buffer: List[Dict[str, Any]], schema,
+               converters: List[Tuple[str, Callable[[Any], Any]]], writers: Dict[str, Any]):
+        arrays = [
+            self.pa.array([convert(row.get(column)) for row in buffer], type=schema.field(column).type)
+            for column, convert in converters
+        ]
+        if partition not in writers:
+            writers[partition] = self.pq.ParquetWriter(self._path(table_name, partition), schema)
+        writers[partition].write_table(self.pa.Table.from_arrays(arrays, schema=schema),
+                                       row_group_size=self.row_group_size)
+
+    def _collect_kinds(self, rows: Iterable[Dict[str, Any]]) -> Dict[str, str]:
+        """Return the value kind of every column, in first-seen order"""
+        kinds = {}
+        for row in rows:
+            for column, value in row.items():
+                if column in self.column_types:
+                    kinds[column] = self.column_types[column]
+                    continue
+                kind = self._value_kind(value)
+                current = kinds.get(column)
+                if current is None or current == kind or kind is None:
+                    kinds[column] = current or kind
+                elif {current, kind} == {'int', 'float'}:
+                    kinds[column] = 'float'
+                else:
+                    kinds[column] = 'string'
+        return {column: kind or 'string' for column, kind in kinds.items()}
+
+    def _value_kind(self, value: Any) -> str:
+        if value is None:
+            return None
+        if isinstance(value, bool):
+            return 'bool'
+        if isinstance(value, int):
+            return 'int'
+        if isinstance(value, float):
+            return 'float'
+        if isinstance(value, (datetime, date)):
+            return 'timestamp'
+        return 'string'
+
+    def _arrow_type(self, kind: str):
+        return {
+            'bool': self.pa.bool_(),
+            'int': self.pa.int64(),
+            'bytes': self.pa.int64(),
+            'float': self.pa.float64(),
+            'timestamp': self.pa.timestamp('us', tz='UTC')
+        }.get(kind, self.pa.string())
+
+    def _converter(self, kind: str) -> Callable[[Any], Any]:
+        return {
+            'bool': lambda value: value,
+            'int': lambda value: value,
+            'float': lambda value: None if value is None else float(value),
+            'bytes': lambda value: value,
+            'timestamp': _to_timestamp
+        }.get(kind, _to_string)
+
+def table_slug(table_name: str) -> str:
+    """Turn a sheet name such as 'EC2 Instances' into 'ec2_instances'"""
+    return re.sub(r'[^a-z0-9]+', '_', table_name.lower()).strip('_')
+
+def _to_string(value: Any) -> str:
+    if value is None:
+        return None
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, default=str)
+    return str(value)
+
+def _to_timestamp(value: Any) -> datetime:
+    """Parse a timestamp rendered with str(); placeholders such as 'N/A' or 'Never' become null"""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            return value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc)
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day, tzinfo=timezone.utc)
+    return None
@@ -0,0 +1,125 @@
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
+from threading import Lock
+import json
+import os
+import tempfile
+import time
+import boto3
+from utils.cache import user_cache_dir
+from config.settings import (REGION_ENDPOINT_SERVICES, REGION_DENIED_ERRORS, REGION_DENIED_TTL,
+                             REGION_LISTING_OPERATIONS, REGION_OPT_IN_STATUSES)
+
+class RegionPlanner:
+    """Drops (region, service) units that cannot succeed before any of them is sent
+
+    Regions that are not enabled for the account, regions where a service has no endpoint,
+    and units that were denied on a recent run are all skipped.
+    """
+
+    def __init__(self, session: boto3.Session, directory: str = None, scope: str = None,
+                 denied_ttl: int = REGION_DENIED_TTL, retry_denied: bool = False):
+        self.session = session
+        self.denied_ttl = denied_ttl
+        self.retry_denied = retry_denied
+        scope = scope or session.profile_name or 'default'
+        self.matrix_path = os.path.join(directory or os.path.join(user_cache_dir(), 'regions'),
+                                        f'denied_{scope}.json')
+        self._denied = None
+        self._lock = Lock()
+
+    def enabled_regions(self) -> List[str]:
+        """Regions the account can use, according to their opt-in status"""
+        try:
+            regions = self.session.client('ec2').describe_regions(AllRegions=True)['Regions']
+        except Exception as e:
+            print(f"Could not describe regions, falling back to the SDK's region list: {str(e)}")
+            return self.session.get_available_regions('ec2')
+        return [region['RegionName'] for region in regions
+                if region.get('OptInStatus', 'opt-in-not-required') in REGION_OPT_IN_STATUSES]
+
+    def service_regions(self, service: str) -> Set[str]:
+        """Regions with an endpoint for the service in botocore's endpoint data; empty when unknown"""
+        endpoint_service = REGION_ENDPOINT_SERVICES.get(service, service)
+        try:
+            return set(self.session.get_available_regions(endpoint_service))
+        except Exception:
+            return set()
+
+    def excluded_units(self, regions: List[str], services: List[str]) -> Set[Tuple[str, str]]:
+        """Return the units to skip and print why"""
+        unavailable, denied = set(), set()
+        denied_matrix = {} if self.retry_denied else self._load_denied()
+        for service in services:
+            available = self.service_regions(service)
+            for region in regions:
+                if available and region not in available:
+                    unavailable.add((region, service))
+                elif f'{region}/{service}' in denied_matrix:
+                    denied.add((region, service))
+
+        if unavailable:
+            print(f"Skipping {len(unavailable)} region/service pairs without a service endpoint")
+        if denied:
+            print(f"Skipping {len(denied)} region/service pairs denied on a recent run "
+                  f"(--retry-denied to probe them again)")
+        return unavailable | denied
+
+    def record_unit(self, region: str, service: str, result: Any = None, error: str = None,
+                    details: Dict[str, Any] = None):
+        """Auditor listener: remember units that failed with an access or opt-in error"""
+        key = f'{region}/{service}'
+        with self._lock:
+            denied = self._load_denied()
+            if error is not None:
+                code = denied_error(service, details or {})
+                if code is None:
+                    return
+                denied[key] = {'error': code, 'recorded_at': time.time()}
+            elif key in denied:
+                del denied[key]
+            else:
+                return
+            self._save_denied(denied)
+
+    def _load_denied(self) -> Dict[str, Dict[str, Any]]:
+        if self._denied is None:
+            try:
+                with open(self.matrix_path) as f:
+                    entries = json.load(f)
+            except (OSError, ValueError):
+                entries = {}
+            now = time.time()
+            # Expired entries are dropped so the pair is probed again
+            self._denied = {key: entry for key, entry in entries.items()
+                            if now - entry.get('recorded_at', 0) <= self.denied_ttl}
+        return self._denied
+
+    def _save_denied(self, denied: Dict[str, Dict[str, Any]]):
+        directory = os.path.dirname(self.matrix_path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(denied, f, indent=2)
+            os.replace(tmp_path, self.matrix_path)
+        except OSError as e:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            print(f"Could not save the region access matrix: {str(e)}")
+
+def denied_error(service: str, details: Dict[str, Any]) -> Optional[str]:
+    """The error code of a unit whose region-wide listing call was denied, None for any other failure"""
+    if (details.get('code') in REGION_DENIED_ERRORS
+            and details.get('operation') in REGION_LISTING_OPERATIONS.get(service, [])):
+        return details['code']
+    return None
+
+def resolve_regions(requested: Iterable[str], enabled: List[str]) -> List[str]:
+    """Expand the --regions argument against the enabled regions"""
+    names = [name.strip() for value in requested for name in value.split(',') if name.strip()]
+    if not names or 'all' in names:
+        return enabled
+    unknown = [name for name in names if name not in enabled]
+    if unknown:
+        raise ValueError(f"Regions not enabled for this account: {', '.join(unknown)}")
+    return names
@@ -1,178 +1,108 @@
-import pandas as pd
 from typing import Dict, Any, List
 from datetime import datetime
 import json
 import os
-import xlsxwriter
+from core.excel_writer import StreamingExcelWriter
+from core.normalize import NormalizedResults, normalize
+from core.parquet_writer import ParquetReportWriter
+from core.sqlite_writer import SQLiteReportWriter
+from services.records import json_default
+from config.settings import (EXCEL_FORMATS, DEFAULT_OUTPUT_FORMATS, PARQUET_ROW_GROUP_SIZE,
+                             SQLITE_DB_NAME, SQLITE_INDEX_COLUMNS)
 
 class ReportGenerator:
-    def __init__(self, results: Dict[str, Any], output_dir: str):
+    def __init__(self, results: Dict[str, Any], output_dir: str, timestamp: str = None,
+                 row_group_size: int = PARQUET_ROW_GROUP_SIZE, partition_by_region: bool = False,
+                 run_id: str = None, sqlite_path: str = None, tag_columns: List[str] = None):
         self.results = results
         self.output_dir = output_dir
-        self.timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-
-    def generate_reports(self):
+        self.timestamp = timestamp or datetime.now().strftime('%Y%m%d_%H%M%S')
+        self.row_group_size = row_group_size
+        self.partition_by_region = partition_by_region
+        self.run_id = run_id or self.timestamp
+        self.sqlite_path = sqlite_path or os.path.join(output_dir, SQLITE_DB_NAME)
+        self.tag_columns = tag_columns or []
+        self._normalized = None
+
+    @property
+    def normalized(self) -> NormalizedResults:
+        """Results routed into report tables, built once and shared by every writer"""
+        if self._normalized is None:
+            self._normalized = normalize(self.results)
+        return self._normalized
+
+    def generate_reports(self, formats: List[str] = DEFAULT_OUTPUT_FORMATS):
         print("\nGenerating reports...")
-        json_path = self._save_json_report()
-        print(f"\nJSON report saved to: {json_path}")
+        if 'json' in formats:
+            json_path = self._save_json_report()
+            print(f"\nJSON report saved to: {json_path}")
         
-        print("\nGenerating Excel report...")
-        excel_path = self._generate_excel_report()
-        print(f"Excel report saved to: {excel_path}")
+        if 'excel' in formats:
+            print("\nGenerating Excel report...")
+            excel_path = self._generate_excel_report()
+            print(f"Excel report saved to: {excel_path}")
+
+        if 'parquet' in formats:
+            print("\nGenerating Parquet tables...")
+            parquet_dir = self._generate_parquet_report()
+            print(f"Parquet tables saved to: {parquet_dir}")
+
+        if 'sqlite' in formats:
+            print("\nWriting SQLite inventory...")
+            sqlite_path = self._generate_sqlite_report()
+            print(f"SQLite inventory saved to: {sqlite_path} (run {self.run_id})")
         
         print("\nAudit complete!")
 
     def _save_json_report(self) -> str:
         json_path = os.path.join(self.output_dir, f'aws_inventory_{self.timestamp}.json')
         with open(json_path, 'w') as f:
-            json.dump(self.results, f, indent=2, default=str)
+            json.dump(self.results, f, indent=2, default=json_default)
         return json_path
 
     def _generate_excel_report(self) -> str:
         excel_path = os.path.join(self.output_dir, f'aws_inventory_{self.timestamp}.xlsx')
         
-        with pd.ExcelWriter(excel_path, engine='xlsxwriter') as writer:
-            workbook = writer.book
-            header_format = self._get_header_format(workbook)
-            
-            self._write_global_resources(writer, header_format)
-            self._write_regional_resources(writer, header_format)
-            self._write_resource_usage_by_region(writer, header_format)
-            self._write_summary(writer, header_format)
+        writer = StreamingExcelWriter(excel_path, EXCEL_FORMATS['header'])
+        try:
+            self._write_resources(writer)
+            self._write_resource_usage_by_region(writer)
+            self._write_summary(writer)
+        finally:
+            writer.close()
 
         return excel_path
 
-    def _get_header_format(self, workbook: xlsxwriter.Workbook) -> Any:
-        return workbook.add_format({
-            'bold': True,
-            'bg_color': '#0066cc',
-            'font_color': 'white',
-            'border': 1
-        })
-
-    def _write_dataframe(self, writer: pd.ExcelWriter, sheet_name: str, 
-                        data: List[Dict[str, Any]], header_format: Any):
+    def _generate_parquet_report(self) -> str:
+        parquet_dir = os.path.join(self.output_dir, f'aws_inventory_{self.timestamp}_parquet')
+        writer = ParquetReportWriter(parquet_dir, row_group_size=self.row_group_size,
+                                     partition_by_region=self.partition_by_region)
+        for table_name, rows in self.normalized.tables.items():
+            writer.write_table(table_name, lambda: rows)
+        return parquet_dir
+
+    def _generate_sqlite_report(self) -> str:
+        writer = SQLiteReportWriter(self.sqlite_path, self.run_id,
+                                    index_columns=SQLITE_INDEX_COLUMNS + self.tag_columns)
+        try:
+            for table_name, rows in self.normalized.tables.items():
+                writer.write_table(table_name, rows)
+        except Exception:
+            writer.abort()
+            raise
+        writer.close(self.normalized.regions(), sorted(self.normalized.services))
+        return self.sqlite_path
+
+    def _write_rows(self, writer: StreamingExcelWriter, sheet_name: str, data: List[Dict[str, Any]]):
         if not data:
             return
+        writer.write_sheet(sheet_name, lambda: data)
 
-        df = pd.DataFrame(data)
-        df.to_excel(writer, sheet_name=sheet_name, index=False)
-        
-        worksheet = writer.sheets[sheet_name]
-        for idx, col in enumerate(df.columns):
-            worksheet.write(0, idx, col, header_format)
-            worksheet.set_column(idx, idx, len(str(col)) + 2)
-        
-        print(f"  Added {len(data)} {sheet_name}")
-
-    def _write_global_resources(self, writer: pd.ExcelWriter, header_format: Any):
-        if 'global_services' in self.results:
-            if 'iam' in self.results['global_services']:
-                iam_data = self.results['global_services']['iam']
-                if 'users' in iam_data:
-                    self._write_dataframe(writer, 'IAM Users', iam_data['users'], header_format)
-                if 'roles' in iam_data:
-                    self._write_dataframe(writer, 'IAM Roles', iam_data['roles'], header_format)
-                if 'groups' in iam_data:
-                    self._write_dataframe(writer, 'IAM Groups', iam_data['groups'], header_format)
-            
-            if 's3' in self.results['global_services']:
-                self._write_dataframe(writer, 'S3 Buckets', 
-                                    self.results['global_services']['s3'],
-                                    header_format)
-                
-            if 'organizations' in self.results['global_services']:
-                org_data = self.results['global_services']['organizations']
-                if 'accounts' in org_data:
-                    self._write_dataframe(writer, 'Organization Accounts', org_data['accounts'], header_format)
-                if 'policies' in org_data:
-                    self._write_dataframe(writer, 'Organization Policies', org_data['policies'], header_format)
-
-    def _write_regional_resources(self, writer: pd.ExcelWriter, header_format: Any):
-        regional_data = {
-            'EC2 Instances': [],
-            'RDS Instances': [],
-            'VPCs': [],
-            'Subnets': [],
-            'Internet Gateways': [],
-            'Routes': [],
-            'Security Groups': [],
-            'Security Group Rules': [],
-            'Lambda Functions': [],
-            'DynamoDB Tables': [],
-            'Bedrock Models': [],
-            'Config Services': [],
-            'EMR Clusters': [],
-            'EMR Steps': [],
-            'EMR Instance Groups': [],
-            'Lightsail Instances': [],
-            'Lightsail Databases': [],
-            'Lightsail Containers': []
-        }
+    def _write_resources(self, writer: StreamingExcelWriter):
+        for sheet_name, rows in self.normalized.tables.items():
+            self._write_rows(writer, sheet_name, rows)
 
-        for region_data in self.results.get('regions', {}).values():
-            for service, data in region_data.items():
-                if 'lightsail' in region_data:
-                    for resource in region_data['lightsail']:
-                        if resource['Resource Type'] == 'Instance':
-                            regional_data['Lightsail Instances'].append(resource)
-                        elif resource['Resource Type'] == 'Database':
-                            regional_data['Lightsail Databases'].append(resource)
-                        elif resource['Resource Type'] == 'Container':
-                            regional_data['Lightsail Containers'].append(resource)
-                if isinstance(data, list):
-                    if service == 'ec2':
-                        regional_data['EC2 Instances'].extend(data)
-                    elif service == 'rds':
-                        regional_data['RDS Instances'].extend(data)
-                    elif service == 'vpc':
-                        for vpc in data:
-                            regional_data['VPCs'].append({k: v for k, v in vpc.items() 
-                                                        if not isinstance(v, (list, dict))})
-                            if 'subnets' in vpc:
-                                regional_data['Subnets'].extend(vpc['subnets'])
-                            if 'internet_gateways' in vpc:
-                                regional_data['Internet Gateways'].extend(vpc['internet_gateways'])
-                            if 'route_tables' in vpc:
-                                regional_data['Routes'].extend(vpc['route_tables'])
-                            if 'security_groups' in vpc:
-                                regional_data['Security Groups'].extend(vpc['security_groups'])
-                            if 'security_group_rules' in vpc:
-                                regional_data['Security Group Rules'].extend(vpc['security_group_rules'])
-                    elif service == 'lambda':
-                        regional_data['Lambda Functions'].extend(data)
-                    elif service == 'dynamodb':
-                        regional_data['DynamoDB Tables'].extend(data)
-                    elif service == 'bedrock':
-                        regional_data['Bedrock Models'].extend(data)
-                    elif service == 'config':
-                        regional_data['Config Services'].extend(data)
-                    elif service == 'emr':
-                        for cluster in data:
-                            # Main cluster info
-                            cluster_info = {k: v for k, v in cluster.items() 
-                                        if not isinstance(v, (list, dict))}
-                            regional_data['EMR Clusters'].append(cluster_info)
-                            
-                            # Instance groups
-                            if cluster.get('Instance Groups'):
-                                for group in cluster['Instance Groups']:
-                                    group['Cluster ID'] = cluster['Cluster ID']
-                                    group['Cluster Name'] = cluster['Name']
-                                    regional_data['EMR Instance Groups'].append(group)
-                            
-                            # Steps
-                            if cluster.get('Steps'):
-                                for step in cluster['Steps']:
-                                    step['Cluster ID'] = cluster['Cluster ID']
-                                    step['Cluster Name'] = cluster['Name']
-                                    regional_data['EMR Steps'].append(step)
-
-        for sheet_name, data in regional_data.items():
-            if data:
-                self._write_dataframe(writer, sheet_name, data, header_format)
-
-    def _write_resource_usage_by_region(self, writer: pd.ExcelWriter, header_format: Any):
+    def _write_resource_usage_by_region(self, writer: StreamingExcelWriter):
         usage_data = []
         services = {
             'EC2': 'ec2',
@@ -183,54 +113,67 @@ class ReportGenerator:
             'Bedrock': 'bedrock'
         }
         
-        for region in self.results.get('regions', {}):
-            row = {'Region': region}
+        for (account, region), counts in self.normalized.region_counts.items():
+            row = self._region_row(account, region)
             for service_name, service_key in services.items():
-                resources = self.results['regions'][region].get(service_key, [])
-                row[service_name] = '✓' if resources and len(resources) > 0 else '-'
+                row[service_name] = '✓' if counts.get(service_key, 0) > 0 else '-'
             usage_data.append(row)
             
-        self._write_dataframe(writer, 'Resource Usage by Region', usage_data, header_format)
+        self._write_rows(writer, 'Resource Usage by Region', usage_data)
+
+    def _write_summary(self, writer: StreamingExcelWriter):
+        normalized = self.normalized
+        global_counts = normalized.global_counts
 
-    def _write_summary(self, writer: pd.ExcelWriter, header_format: Any):
         # Resource Counts
         resource_counts = [
-            {'Category': 'Regions Found', 'Count': len(self.results.get('regions', {}))},
-            {'Category': 'EC2 Instances', 'Count': sum(len(r.get('ec2', [])) for r in self.results['regions'].values())},
-            {'Category': 'RDS Instances', 'Count': sum(len(r.get('rds', [])) for r in self.results['regions'].values())},
-            {'Category': 'VPC Resources', 'Count': sum(len(r.get('vpc', [])) for r in self.results['regions'].values())},
-            {'Category': 'Lambda Functions', 'Count': sum(len(r.get('lambda', [])) for r in self.results['regions'].values())},
-            {'Category': 'DynamoDB Tables', 'Count': sum(len(r.get('dynamodb', [])) for r in self.results['regions'].values())},
-            {'Category': 'Bedrock Models', 'Count': sum(len(r.get('bedrock', [])) for r in self.results['regions'].values())},
-            {'Category': 'IAM Users', 'Count': len(self.results.get('global_services', {}).get('iam', {}).get('users', []))},
-            {'Category': 'IAM Roles', 'Count': len(self.results.get('global_services', {}).get('iam', {}).get('roles', []))},
-            {'Category': 'IAM Groups', 'Count': len(self.results.get('global_services', {}).get('iam', {}).get('groups', []))},
-            {'Category': 'S3 Buckets', 'Count': len(self.results.get('global_services', {}).get('s3', []))},
-            {'Category': 'EMR Clusters', 'Count': sum(len(r.get('emr', [])) for r in self.results['regions'].values())},
+            {'Category': 'Regions Found', 'Count': len(normalized.regions())},
+            {'Category': 'EC2 Instances', 'Count': normalized.total('ec2')},
+            {'Category': 'RDS Instances', 'Count': normalized.total('rds')},
+            {'Category': 'VPC Resources', 'Count': normalized.total('vpc')},
+            {'Category': 'Lambda Functions', 'Count': normalized.total('lambda')},
+            {'Category': 'DynamoDB Tables', 'Count': normalized.total('dynamodb')},
+            {'Category': 'Bedrock Models', 'Count': normalized.total('bedrock')},
+            {'Category': 'IAM Users', 'Count': global_counts.get('iam.users', 0)},
+            {'Category': 'IAM Roles', 'Count': global_counts.get('iam.roles', 0)},
+            {'Category': 'IAM Groups', 'Count': global_counts.get('iam.groups', 0)},
+            {'Category': 'S3 Buckets', 'Count': global_counts.get('s3', 0)},
+            {'Category': 'EMR Clusters', 'Count': normalized.total('emr')},
         ]
-        self._write_dataframe(writer, 'Resource Counts', resource_counts, header_format)
+        if normalized.accounts:
+            resource_counts.insert(0, {'Category': 'Accounts', 'Count': len(normalized.accounts)})
+        self._write_rows(writer, 'Resource Counts', resource_counts)
+
+        # Account Summary, only for organization audits
+        self._write_rows(writer, 'Account Summary', list(normalized.accounts.values()))
 
         # Region Summary
-        successful_regions = [r for r in self.results['regions'].values() if 'error' not in r]
-        failed_regions = [r for r in self.results['regions'].values() if 'error' in r]
+        total_regions = len(normalized.region_counts)
+        failed_regions = len(normalized.region_errors)
         
         region_summary = [
-            {'Category': 'Total Regions', 'Count': len(self.results.get('regions', {}))},
-            {'Category': 'Successful Regions', 'Count': len(successful_regions)},
-            {'Category': 'Failed Regions', 'Count': len(failed_regions)}
+            {'Category': 'Total Regions', 'Count': total_regions},
+            {'Category': 'Successful Regions', 'Count': total_regions - failed_regions},
+            {'Category': 'Failed Regions', 'Count': failed_regions}
         ]
-        self._write_dataframe(writer, 'Region Summary', region_summary, header_format)
+        self._write_rows(writer, 'Region Summary', region_summary)
 
         # Per-Region Details
         region_details = []
-        for region, data in self.results.get('regions', {}).items():
+        for (account, region), counts in normalized.region_counts.items():
             region_details.append({
-                'Region': region,
-                'EC2 Instances': len(data.get('ec2', [])),
-                'RDS Instances': len(data.get('rds', [])),
-                'VPCs': len(data.get('vpc', [])),
-                'Lambda Functions': len(data.get('lambda', [])),
-                'DynamoDB Tables': len(data.get('dynamodb', [])),
-                'Bedrock Models': len(data.get('bedrock', []))
+                **self._region_row(account, region),
+                'EC2 Instances': counts.get('ec2', 0),
+                'RDS Instances': counts.get('rds', 0),
+                'VPCs': counts.get('vpc', 0),
+                'Lambda Functions': counts.get('lambda', 0),
+                'DynamoDB Tables': counts.get('dynamodb', 0),
+                'Bedrock Models': counts.get('bedrock', 0)
             })
-        self._write_dataframe(writer, 'Region Details', region_details, header_format)
\ No newline at end of file
+        self._write_rows(writer, 'Region Details', region_details)
+
+    def _region_row(self, account: str, region: str) -> Dict[str, Any]:
+        """Leading columns of a per-region row, with the account in organization audits"""
+        if account is None:
+            return {'Region': region}
+        return {'Account': account, 'Region': region}
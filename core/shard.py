@@ -0,0 +1,254 @@
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from itertools import zip_longest
+from threading import Event, Lock, Thread
+import multiprocessing
+import os
+import socket
+import sqlite3
+import time
+import boto3
+from core.auditor import AWSAuditor, error_details
+from core.checkpoint import CheckpointStore
+from core.organization import OrganizationAuditor
+from core.regions import RegionPlanner
+from core.work_queue import Unit, WorkQueue
+from utils.circuit_breaker import CircuitBreaker
+from utils.rate_limit import RateLimiter
+from config.settings import SHARD_POLL_SECONDS, SHARD_QUEUE_NAME, SHARD_WORKER_THREADS
+
+class ShardedRun:
+    """An audit whose units are spread over worker processes, on this machine or several
+
+    The coordinator plans the (account, region, service) units and queues them in the run's
+    checkpoint directory. Workers lease units from the queue and save each outcome in the
+    checkpoint format, one directory per account, and the merge step assembles the saved
+    units into the usual results. A worker that stops only loses its leased units, which
+    the other workers, or the next worker started for the run, pick up again.
+
+    API limits are per account, so each worker paces its calls at an equal share of the rates,
+    and the queue keeps the units in flight per account under the run's account concurrency.
+    """
+
+    def __init__(self, session: boto3.Session, directory: str, run_id: str, shards: int = 0,
+                 threads: int = SHARD_WORKER_THREADS):
+        self.session = session
+        self.directory = directory
+        self.run_id = run_id
+        self.shards = shards
+        self.threads = threads
+        self.checkpoint = CheckpointStore(directory, run_id)
+        self.listener_factories = []
+        self._queue = None
+        self._manifest = None
+        self._auditors: Dict[str, AWSAuditor] = {}
+        self._organization: Optional[OrganizationAuditor] = None
+        self._rate_limiter: Optional[RateLimiter] = None
+        self._lock = Lock()
+
+    @property
+    def queue(self) -> WorkQueue:
+        if self._queue is None:
+            self._queue = WorkQueue(os.path.join(self.checkpoint.run_dir, SHARD_QUEUE_NAME))
+        return self._queue
+
+    @property
+    def manifest(self) -> Dict[str, Any]:
+        if self._manifest is None:
+            self._manifest = self.checkpoint.load_manifest()
+        return self._manifest
+
+    def exists(self) -> bool:
+        return (self.checkpoint.exists()
+                and os.path.exists(os.path.join(self.checkpoint.run_dir, SHARD_QUEUE_NAME)))
+
+    def add_listener(self, factory: Callable[[str], Callable[..., None]]):
+        """Register factory(account_id) returning a listener that sees every merged unit"""
+        self.listener_factories.append(factory)
+
+    def create(self, regions: List[str], services: List[str], options: Dict[str, Any],
+               org_role: str = None, retry_denied: bool = False):
+        """Plan and queue every unit; options are the auditor settings all workers use"""
+        # Workers started with --worker take the same share of the API rates as the local ones
+        extra = {'sharded': True, 'options': options, 'org_role': org_role, 'shards': max(1, self.shards)}
+        if org_role:
+            organization = OrganizationAuditor(self.session, org_role, regions, services,
+                                               retry_denied=retry_denied)
+            auditors = organization.prepare()
+            services = organization.services
+            extra['organization'] = organization.results['organization']
+            extra['accounts'] = {
+                account_id: ({'Name': data['account']['Name'], 'error': data['error']} if 'error' in data
+                             else {'Name': data['account']['Name'], 'regions': auditors[account_id].regions})
+                for account_id, data in organization.results['accounts'].items()
+            }
+        else:
+            planner = RegionPlanner(self.session, retry_denied=retry_denied)
+            auditor = AWSAuditor(self.session, regions, services)
+            auditor.exclude_units(planner.excluded_units(regions, services))
+            auditors = {'': auditor}
+            extra['account_id'] = self.session.client('sts').get_caller_identity()['Account']
+
+        # Interleave the accounts so every worker spreads its calls over them
+        plans = [[(account_id, region, service) for region, service in auditor.plan_units()]
+                 for account_id, auditor in auditors.items()]
+        units = [unit for batch in zip_longest(*plans) for unit in batch if unit is not None]
+        self.queue.add_units(units)
+        # The manifest is written last, a run without one was never fully queued
+        self.checkpoint.save_manifest(regions, services, **extra)
+        print(f"Queued {len(units)} units of {len(auditors)} accounts")
+
+    def run_audit(self) -> Dict[str, Any]:
+        """Run the local worker processes, if any, and merge what the workers saved"""
+        if self.shards:
+            self.run_local()
+        return self.merge()
+
+    def run_local(self):
+        """Drain the queue with worker processes on this machine"""
+        print(f"Starting {self.shards} worker processes with {self.threads} threads each")
+        context = multiprocessing.get_context('spawn')
+        processes = [
+            context.Process(target=_worker_process, name=f'shard-{idx}',
+                            args=(self.directory, self.run_id, self.threads, self.shards))
+            for idx in range(self.shards)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+            if process.exitcode:
+                print(f"Worker {process.name} exited with code {process.exitcode}, "
+                      f"its unfinished units run again with --worker {self.run_id}")
+
+    def work(self) -> int:
+        """Lease and run units until the queue is drained; returns the number of units run"""
+        worker = f"{socket.gethostname()}-{os.getpid()}"
+        stop = Event()
+        heartbeat = Thread(target=self._heartbeat, args=(worker, stop), name='shard-heartbeat', daemon=True)
+        heartbeat.start()
+        try:
+            with ThreadPoolExecutor(max_workers=self.threads) as executor:
+                finished = sum(executor.map(self._work_loop, [worker] * self.threads))
+        finally:
+            stop.set()
+        print(f"Worker {worker} finished {finished} units")
+        return finished
+
+    def merge(self) -> Dict[str, Any]:
+        """Assemble the saved units into the results structure the reports expect"""
+        manifest = self.manifest
+        counts = self.queue.counts()
+        unfinished = counts.get('pending', 0) + counts.get('leased', 0)
+        if unfinished:
+            print(f"{unfinished} units have not finished and are reported as errors, "
+                  f"run --worker {self.run_id} to finish them")
+
+        queued: Dict[str, Set[Tuple[str, str]]] = {}
+        for account_id, region, service in self.queue.units():
+            queued.setdefault(account_id, set()).add((region, service))
+
+        if not manifest.get('org_role'):
+            return self._merge_account('', manifest['regions'], queued.get('', set()), manifest['account_id'])
+
+        results = {'organization': manifest['organization'], 'accounts': {}}
+        for account_id, account in manifest['accounts'].items():
+            entry = {'account': {'Id': account_id, 'Name': account.get('Name')}}
+            if 'error' in account:
+                entry['error'] = account['error']
+            else:
+                entry.update(self._merge_account(account_id, account['regions'],
+                                                 queued.get(account_id, set()), account_id))
+            results['accounts'][account_id] = entry
+        return results
+
+    def _merge_account(self, account: str, regions: List[str], queued: Set[Tuple[str, str]],
+                       listener_account: str) -> Dict[str, Any]:
+        services = self.manifest['services']
+        store = self._store(account)
+        saved = store.load_units() if os.path.isdir(store.run_dir) else {}
+
+        auditor = AWSAuditor(self.session, regions, services, account_id=account or None)
+        auditor.exclude_units({(region, service) for region in regions for service in services} - queued)
+        # Merging replays every unit, so the denied matrix and the listeners see them all here
+        auditor.add_listener(RegionPlanner(self.session, scope=account or None).record_unit)
+        for factory in self.listener_factories:
+            auditor.add_listener(factory(listener_account))
+        auditor.restore_units({unit: data['result'] for unit, data in saved.items()
+                               if unit in queued and 'error' not in data})
+        for region, service in auditor.begin_run():
+            data = saved.get((region, service), {})
+            auditor.record_error(region, service, data.get('error', 'Unit did not finish'), data.get('details'))
+        return auditor.finish_run()
+
+    def _work_loop(self, worker: str) -> int:
+        finished = 0
+        account_limit = self.manifest['options'].get('account_concurrency') if self.manifest.get('org_role') else None
+        while True:
+            unit = self.queue.lease(worker, account_limit=account_limit)
+            if unit is None:
+                # Units leased by other workers come back to the queue if those workers stop,
+                # and units held back by the account limit once the account's leases finish
+                if not self.queue.active_leases():
+                    return finished
+                time.sleep(SHARD_POLL_SECONDS)
+                continue
+            self._run_unit(worker, unit)
+            finished += 1
+
+    def _run_unit(self, worker: str, unit: Unit):
+        account, region, service = unit
+        store = self._store(account)
+        try:
+            result = self._auditor(account).run_unit(region, service)
+        except Exception as e:
+            print(f"Unexpected error auditing {service} in {region}"
+                  f"{f' of account {account}' if account else ''}: {str(e)}")
+            store.save_unit(region, service, error=str(e), details=error_details(e))
+            self.queue.complete(unit, worker, failed=True)
+            return
+        store.save_unit(region, service, result=result)
+        self.queue.complete(unit, worker)
+
+    def _auditor(self, account: str) -> AWSAuditor:
+        with self._lock:
+            if account not in self._auditors:
+                self._auditors[account] = self._build_auditor(account)
+            return self._auditors[account]
+
+    def _build_auditor(self, account: str) -> AWSAuditor:
+        manifest = self.manifest
+        options = manifest['options']
+        if manifest.get('org_role'):
+            if self._organization is None:
+                self._organization = OrganizationAuditor(self.session, manifest['org_role'], [], [])
+                self._organization.connect()
+            session, session_factory = self._organization.account_session(account)
+            regions = manifest['accounts'][account]['regions']
+        else:
+            session, session_factory = self.session, None
+            regions = manifest['regions']
+        if self._rate_limiter is None:
+            self._rate_limiter = RateLimiter(share=1 / (self.shards or manifest.get('shards', 1)))
+        return AWSAuditor(session, regions, manifest['services'], max_workers=self.threads,
+                          service_options=options['service_options'], tag_columns=options['tag_columns'],
+                          client_config=options['client_config'],
+                          circuit_breaker=CircuitBreaker(threshold=options['breaker_threshold']),
+                          rate_limiter=self._rate_limiter, account_id=account or None, session_factory=session_factory)
+
+    def _store(self, account: str) -> CheckpointStore:
+        """Unit files of an account; a single-account run keeps them next to the manifest"""
+        if not account:
+            return self.checkpoint
+        return CheckpointStore(self.checkpoint.run_dir, account)
+
+    def _heartbeat(self, worker: str, stop: Event):
+        while not stop.wait(self.queue.lease_seconds / 4):
+            try:
+                self.queue.renew(worker)
+            except sqlite3.Error as e:
+                print(f"Could not renew the leases of worker {worker}: {str(e)}")
+
+def _worker_process(directory: str, run_id: str, threads: int, shards: int):
+    """Entry point of a local worker process"""
+    ShardedRun(boto3.Session(), directory, run_id, shards=shards, threads=threads).work()
@@ -0,0 +1,135 @@
+from typing import Any, Dict, Iterable, List
+from datetime import date, datetime
+import json
+import os
+import sqlite3
+import time
+from core.parquet_writer import table_slug
+from config.settings import SQLITE_BATCH_SIZE, SQLITE_INDEX_COLUMNS
+
+class SQLiteReportWriter:
+    """Writes one table per resource type into a SQLite inventory that can hold many runs
+
+    Everything from one run is written in a single transaction, so a failed report never
+    leaves a half-written run behind.
+    """
+
+    def __init__(self, path: str, run_id: str, index_columns: List[str] = None,
+                 batch_size: int = SQLITE_BATCH_SIZE):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.run_id = run_id
+        self.index_columns = SQLITE_INDEX_COLUMNS if index_columns is None else index_columns
+        self.batch_size = batch_size
+        self.tables = {}
+        self.connection = sqlite3.connect(path, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('BEGIN')
+        self.connection.execute('''
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id TEXT PRIMARY KEY,
+                created_at REAL NOT NULL,
+                regions TEXT,
+                services TEXT,
+                tables TEXT
+            )
+        ''')
+        self._discard_previous_rows()
+
+    def write_table(self, table_name: str, rows: Iterable[Dict[str, Any]]) -> int:
+        """Insert rows in batches and return the row count; new keys become new columns"""
+        table = table_slug(table_name)
+        written = 0
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                written += self._insert(table, batch)
+                batch = []
+        if batch:
+            written += self._insert(table, batch)
+
+        if written:
+            self._create_indexes(table)
+            print(f"  Added {written} {table_name}")
+        return written
+
+    def close(self, regions: List[str] = None, services: List[str] = None):
+        """Record the run and commit everything written since the writer was opened"""
+        try:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO runs (run_id, created_at, regions, services, tables) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (self.run_id, time.time(), json.dumps(regions), json.dumps(services),
+                 json.dumps(sorted(self.tables)))
+            )
+            self.connection.execute('COMMIT')
+        except Exception:
+            self.connection.execute('ROLLBACK')
+            raise
+        finally:
+            self.connection.close()
+
+    def abort(self):
+        """Discard everything written since the writer was opened"""
+        self.connection.execute('ROLLBACK')
+        self.connection.close()
+
+    def _discard_previous_rows(self):
+        """A resumed run replaces the rows it wrote the last time its report was generated"""
+        row = self.connection.execute('SELECT tables FROM runs WHERE run_id = ?', (self.run_id,)).fetchone()
+        if row is None:
+            return
+        for table in json.loads(row[0] or '[]'):
+            self.connection.execute(f'DELETE FROM {_quote(table)} WHERE run_id = ?', (self.run_id,))
+
+    def _insert(self, table: str, batch: List[Dict[str, Any]]) -> int:
+        columns = self._ensure_columns(table, batch)
+        placeholders = ', '.join('?' for _ in range(len(columns) + 1))
+        column_list = ', '.join(['run_id'] + [_quote(column) for column in columns])
+        self.connection.executemany(
+            f'INSERT INTO {_quote(table)} ({column_list}) VALUES ({placeholders})',
+            ([self.run_id] + [_to_sql(row.get(column)) for column in columns] for row in batch)
+        )
+        return len(batch)
+
+    def _ensure_columns(self, table: str, batch: List[Dict[str, Any]]) -> List[str]:
+        """Create the table on first use and add any columns this batch introduces"""
+        if table not in self.tables:
+            self.connection.execute(f'CREATE TABLE IF NOT EXISTS {_quote(table)} (run_id TEXT NOT NULL)')
+            existing = [info[1] for info in self.connection.execute(f'PRAGMA table_info({_quote(table)})')]
+            self.tables[table] = {column: None for column in existing if column != 'run_id'}
+
+        known = self.tables[table]
+        for row in batch:
+            for column in row:
+                if column not in known:
+                    self.connection.execute(f'ALTER TABLE {_quote(table)} ADD COLUMN {_quote(column)}')
+                    known[column] = None
+        return list(known)
+
+    def _create_indexes(self, table: str):
+        columns = self.tables[table]
+        self.connection.execute(
+            f'CREATE INDEX IF NOT EXISTS {_quote(f"idx_{table}_run_id")} ON {_quote(table)} (run_id)'
+        )
+        for column in self.index_columns:
+            if column in columns:
+                index = f"idx_{table}_{table_slug(column)}"
+                self.connection.execute(
+                    f'CREATE INDEX IF NOT EXISTS {_quote(index)} ON {_quote(table)} ({_quote(column)})'
+                )
+
+def _quote(identifier: str) -> str:
+    return '"' + str(identifier).replace('"', '""') + '"'
+
+def _to_sql(value: Any) -> Any:
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, default=str)
+    return str(value)
@@ -0,0 +1,127 @@
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from contextlib import contextmanager
+import os
+import sqlite3
+import time
+from config.settings import SHARD_LEASE_SECONDS
+
+Unit = Tuple[str, str, str]
+
+class WorkQueue:
+    """SQLite queue of (account, region, service) units shared by the workers of a sharded run
+
+    A worker leases one unit at a time and keeps the lease alive while the unit runs. Units
+    whose lease expires, because the worker stopped, are handed to the next worker that asks.
+    Every call opens its own connection, so one queue object can be used from any thread.
+    The queue keeps SQLite's rollback journal rather than WAL, whose shared-memory index
+    only works between processes on one host, so workers on several machines can share the
+    file as long as their filesystem supports file locks.
+    """
+
+    def __init__(self, path: str, lease_seconds: float = SHARD_LEASE_SECONDS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as connection:
+            connection.execute('PRAGMA journal_mode=DELETE')
+            connection.execute('''
+                CREATE TABLE IF NOT EXISTS units (
+                    seq INTEGER PRIMARY KEY,
+                    account TEXT NOT NULL,
+                    region TEXT NOT NULL,
+                    service TEXT NOT NULL,
+                    state TEXT NOT NULL DEFAULT 'pending',
+                    worker TEXT,
+                    lease_expires REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    UNIQUE (account, region, service)
+                )
+            ''')
+
+    def add_units(self, units: Iterable[Unit]) -> int:
+        with self._connect() as connection:
+            cursor = connection.executemany(
+                'INSERT OR IGNORE INTO units (account, region, service) VALUES (?, ?, ?)', units)
+            return cursor.rowcount
+
+    def lease(self, worker: str, account_limit: int = None) -> Optional[Unit]:
+        """Take the next pending or abandoned unit, None when there is none
+
+        With account_limit, units of accounts that already have that many live leases, across
+        all workers, are passed over.
+        """
+        now = time.time()
+        with self._connect() as connection:
+            # BEGIN IMMEDIATE takes the write lock up front, so two workers never lease the same unit
+            connection.execute('BEGIN IMMEDIATE')
+            row = connection.execute(
+                "SELECT seq, account, region, service FROM units "
+                "WHERE (state = 'pending' OR (state = 'leased' AND lease_expires < ?)) "
+                "AND (? IS NULL OR account NOT IN ("
+                "    SELECT account FROM units WHERE state = 'leased' AND lease_expires >= ? "
+                "    GROUP BY account HAVING COUNT(*) >= ?)) "
+                "ORDER BY seq LIMIT 1", (now, account_limit, now, account_limit)
+            ).fetchone()
+            if row is None:
+                connection.execute('COMMIT')
+                return None
+            connection.execute(
+                "UPDATE units SET state = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1 "
+                "WHERE seq = ?", (worker, now + self.lease_seconds, row[0])
+            )
+            connection.execute('COMMIT')
+        return row[1], row[2], row[3]
+
+    def renew(self, worker: str):
+        """Extend every lease the worker holds"""
+        with self._connect() as connection:
+            connection.execute(
+                "UPDATE units SET lease_expires = ? WHERE worker = ? AND state = 'leased'",
+                (time.time() + self.lease_seconds, worker)
+            )
+
+    def complete(self, unit: Unit, worker: str, failed: bool = False):
+        """Mark a leased unit done or failed, unless its lease has passed to another worker"""
+        with self._connect() as connection:
+            connection.execute(
+                "UPDATE units SET state = ?, lease_expires = NULL "
+                "WHERE account = ? AND region = ? AND service = ? AND worker = ? AND state = 'leased'",
+                ('failed' if failed else 'done', *unit, worker)
+            )
+
+    def reset_failed(self) -> int:
+        """Queue failed units again"""
+        with self._connect() as connection:
+            return connection.execute(
+                "UPDATE units SET state = 'pending', worker = NULL WHERE state = 'failed'").rowcount
+
+    def active_leases(self) -> int:
+        with self._connect() as connection:
+            return connection.execute(
+                "SELECT COUNT(*) FROM units WHERE state = 'leased' AND lease_expires >= ?",
+                (time.time(),)
+            ).fetchone()[0]
+
+    def units(self) -> List[Unit]:
+        with self._connect() as connection:
+            return [tuple(row) for row in connection.execute(
+                'SELECT account, region, service FROM units ORDER BY seq')]
+
+    def counts(self) -> Dict[str, int]:
+        """Number of units in each state"""
+        with self._connect() as connection:
+            return dict(connection.execute('SELECT state, COUNT(*) FROM units GROUP BY state'))
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield connection
+        except BaseException:
+            if connection.in_transaction:
+                connection.execute('ROLLBACK')
+            raise
+        finally:
+            connection.close()
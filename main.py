@@ -2,43 +2,292 @@
 import argparse
 import boto3
 import os
+from datetime import datetime
 import xlsxwriter
 from core.auditor import AWSAuditor
 from core.report import ReportGenerator
-from config.settings import AVAILABLE_SERVICES, DEFAULT_MAX_WORKERS
+from core.checkpoint import CheckpointStore
+from core.organization import OrganizationAuditor
+from core.shard import ShardedRun
+from core.regions import RegionPlanner, resolve_regions
+from core.ndjson_writer import NDJSONWriter
+from utils.cache import user_cache_dir
+from utils.snapshot import SnapshotStore
+from utils.circuit_breaker import CircuitBreaker
+from config.settings import (AVAILABLE_SERVICES, DEFAULT_MAX_WORKERS,
+                             S3_METRICS_STRATEGIES, S3_EXACT_COUNT_MAX_OBJECTS, IAM_MODES,
+                             LAMBDA_ENRICHMENT_FIELDS, DEFAULT_TAG_COLUMNS, EMR_CLUSTER_STATES,
+                             OUTPUT_FORMATS, DEFAULT_OUTPUT_FORMATS, NDJSON_COMPRESSION,
+                             PARQUET_ROW_GROUP_SIZE, CLIENT_CONFIG, CIRCUIT_BREAKER_THRESHOLD,
+                             ORG_MAX_WORKERS, ORG_ACCOUNT_CONCURRENCY, SHARD_WORKER_THREADS,
+                             SNAPSHOT_MAX_AGE)
 
-def valid_regions(session: boto3.Session) -> list:
-    ec2 = session.client('ec2')
-    available_regions = [r['RegionName'] for r in ec2.describe_regions()['Regions']]
-    return available_regions
-
-def parse_arguments(regions: list):
+def parse_arguments():
     parser = argparse.ArgumentParser(description='AWS Resource Audit Tool')
-    parser.add_argument('--regions', choices=regions, nargs='+', type=str,
-                       help='Comma-separated list of regions or "all"',
-                       default='all')
+    parser.add_argument('--regions', nargs='+', type=str,
+                       help='Regions to audit (space- or comma-separated) or "all"',
+                       default=['all'])
     parser.add_argument('--services', type=str, 
                        help=f'Comma-separated list of services {AVAILABLE_SERVICES}',
                        default='all')
+    parser.add_argument('--org-role', type=str, metavar='ROLE_NAME',
+                       help='Audit every active account of the organization by assuming this role in each',
+                       default=None)
+    parser.add_argument('--account-concurrency', type=int,
+                       help='With --org-role, maximum units in flight per account (across all workers '
+                            'of a sharded run)',
+                       default=ORG_ACCOUNT_CONCURRENCY)
+    parser.add_argument('--retry-denied', action='store_true',
+                       help='Probe region/service pairs that were denied on a recent run')
     parser.add_argument('--output-dir', type=str,
                        help='Directory for output files',
                        default='results')
-    return parser.parse_args()
+    parser.add_argument('--formats', type=str,
+                       help=f'Comma-separated output formats {OUTPUT_FORMATS}',
+                       default=','.join(DEFAULT_OUTPUT_FORMATS))
+    parser.add_argument('--compression', choices=NDJSON_COMPRESSION,
+                       help='Compression for the NDJSON output',
+                       default='none')
+    parser.add_argument('--row-group-size', type=int,
+                       help='Rows per Parquet row group',
+                       default=PARQUET_ROW_GROUP_SIZE)
+    parser.add_argument('--partition-by-region', action='store_true',
+                       help='Write Parquet tables partitioned into one directory per region')
+    parser.add_argument('--sqlite-db', type=str,
+                       help='SQLite inventory file for the sqlite format (default: <output-dir>/aws_inventory.db)')
+    parser.add_argument('--connect-timeout', type=float,
+                       help='Seconds to wait for a connection to an AWS endpoint',
+                       default=CLIENT_CONFIG['connect_timeout'])
+    parser.add_argument('--read-timeout', type=float,
+                       help='Seconds to wait for an AWS API response',
+                       default=CLIENT_CONFIG['read_timeout'])
+    parser.add_argument('--max-attempts', type=int,
+                       help='Attempts per AWS API call, including retries',
+                       default=CLIENT_CONFIG['retries']['max_attempts'])
+    parser.add_argument('--breaker-threshold', type=int,
+                       help='Consecutive failures before calls to a region/service pair fail fast',
+                       default=CIRCUIT_BREAKER_THRESHOLD)
+    parser.add_argument('--s3-metrics', choices=S3_METRICS_STRATEGIES,
+                       help='How S3 bucket sizes and object counts are collected',
+                       default='cloudwatch')
+    parser.add_argument('--s3-exact-cap', type=int,
+                       help='Maximum objects counted per bucket with --s3-metrics exact',
+                       default=S3_EXACT_COUNT_MAX_OBJECTS)
+    parser.add_argument('--iam-mode', choices=IAM_MODES,
+                       help='bulk uses GetAccountAuthorizationDetails and the credential report, '
+                            'standard makes per-principal calls',
+                       default='bulk')
+    parser.add_argument('--lambda-skip', type=str,
+                       help=f'Comma-separated Lambda enrichment fields to skip {LAMBDA_ENRICHMENT_FIELDS}',
+                       default='')
+    parser.add_argument('--tag-keys', type=str,
+                       help='Comma-separated tag keys reported as columns',
+                       default=','.join(DEFAULT_TAG_COLUMNS))
+    parser.add_argument('--emr-states', type=str,
+                       help=f'Comma-separated EMR cluster states to audit {EMR_CLUSTER_STATES}',
+                       default='all')
+    parser.add_argument('--emr-created-after-days', type=int,
+                       help='Only audit EMR clusters created within this many days',
+                       default=None)
+    parser.add_argument('--refresh-cache', action='store_true',
+                       help='Ignore cached API responses and fetch them again')
+    parser.add_argument('--incremental', action='store_true',
+                       help='Only make per-resource enrichment calls for new or changed resources')
+    parser.add_argument('--snapshot-db', type=str,
+                       help='SQLite snapshot store used by --incremental',
+                       default=os.path.join(user_cache_dir(), 'snapshots.db'))
+    parser.add_argument('--snapshot-max-age', type=float,
+                       help='Hours before --incremental fetches enrichment again that no change marker covers',
+                       default=SNAPSHOT_MAX_AGE / 3600)
+    parser.add_argument('--checkpoint-dir', type=str,
+                       help='Directory for per-unit checkpoints (default: <output-dir>/checkpoints)',
+                       default=None)
+    parser.add_argument('--resume', type=str, metavar='RUN_ID',
+                       help='Resume a checkpointed run, re-running only missing or failed units',
+                       default=None)
+    parser.add_argument('--retry-failed', action='store_true',
+                       help='With --resume, re-run only the units that failed')
+    sharding = parser.add_mutually_exclusive_group()
+    sharding.add_argument('--shards', type=int,
+                       help='Spread the units over this many local worker processes through a work '
+                            'queue in the checkpoint directory (with --resume, continue a sharded run)',
+                       default=0)
+    sharding.add_argument('--worker', type=str, metavar='RUN_ID',
+                       help='Work on the queue of a sharded run, e.g. from another machine sharing '
+                            'the checkpoint directory',
+                       default=None)
+    sharding.add_argument('--merge', type=str, metavar='RUN_ID',
+                       help='Merge the partial results of a sharded run and write the reports',
+                       default=None)
+    parser.add_argument('--worker-threads', type=int,
+                       help='Units run at once by each worker of a sharded run',
+                       default=SHARD_WORKER_THREADS)
+    args = parser.parse_args()
+    if args.retry_failed and not args.resume:
+        parser.error('--retry-failed requires --resume')
+    if args.org_role and args.resume and not args.shards:
+        parser.error('--resume is only supported with --org-role for sharded runs')
+    if args.shards < 0 or args.worker_threads < 1:
+        parser.error('--shards cannot be negative and --worker-threads must be at least 1')
+    if args.resume and (args.worker or args.merge):
+        parser.error('--worker and --merge take the run id, --resume is not needed')
+    if args.incremental and (args.shards or args.worker or args.merge):
+        parser.error('--incremental is not supported for sharded runs')
+    if args.account_concurrency < 1:
+        parser.error('--account-concurrency must be at least 1')
+    return args
+
+def build_tag_columns(args) -> dict:
+    keys = [key.strip() for key in args.tag_keys.split(',') if key.strip()]
+    return {key: DEFAULT_TAG_COLUMNS.get(key, key) for key in keys}
+
+def build_client_config(args) -> dict:
+    return {
+        'connect_timeout': args.connect_timeout,
+        'read_timeout': args.read_timeout,
+        'retries': {**CLIENT_CONFIG['retries'], 'max_attempts': args.max_attempts}
+    }
+
+def build_service_options(args) -> dict:
+    return {
+        'bedrock': {
+            'refresh_cache': args.refresh_cache
+        },
+        'emr': {
+            'cluster_states': args.emr_states.upper().split(',') if args.emr_states != 'all' else None,
+            'created_after_days': args.emr_created_after_days
+        },
+        'iam': {
+            'mode': args.iam_mode
+        },
+        'lambda': {
+            'enrich_fields': [field for field in LAMBDA_ENRICHMENT_FIELDS
+                              if field not in args.lambda_skip.lower().split(',')]
+        },
+        's3': {
+            'metrics_strategy': args.s3_metrics,
+            'exact_count_cap': args.s3_exact_cap
+        }
+    }
 
 def main():
+    args = parse_arguments()
     session = boto3.Session()
-    regions = valid_regions(session)
-    args = parse_arguments(regions)
     
     try:
         services = args.services.lower().split(',') if args.services != 'all' else AVAILABLE_SERVICES
-        
-        auditor = AWSAuditor(session, regions, services)
-        results = auditor.run_audit(max_workers=DEFAULT_MAX_WORKERS)
-        
+        formats = args.formats.lower().split(',')
+        unknown_formats = [fmt for fmt in formats if fmt not in OUTPUT_FORMATS]
+        if unknown_formats:
+            raise ValueError(f"Unknown output formats: {', '.join(unknown_formats)}")
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         os.makedirs(args.output_dir, exist_ok=True)
-        report_generator = ReportGenerator(results, args.output_dir)
-        report_generator.generate_reports()
+
+        checkpoint_dir = args.checkpoint_dir or os.path.join(args.output_dir, 'checkpoints')
+        if args.worker:
+            worker = ShardedRun(session, checkpoint_dir, args.worker, threads=args.worker_threads)
+            if not worker.exists():
+                print(f"No sharded run {args.worker} in {checkpoint_dir}")
+                return 1
+            worker.work()
+            return 0
+
+        planner = RegionPlanner(session, retry_denied=args.retry_denied)
+        snapshot_store = (SnapshotStore(args.snapshot_db, max_age=args.snapshot_max_age * 3600)
+                          if args.incremental else None)
+        if args.shards or args.merge:
+            run_id = args.merge or args.resume or CheckpointStore.new_run_id()
+            auditor = ShardedRun(session, checkpoint_dir, run_id, shards=args.shards,
+                                 threads=args.worker_threads)
+            print(f"Sharded run id: {run_id}")
+            if args.merge or args.resume:
+                if not auditor.exists():
+                    print(f"No sharded run {run_id} in {checkpoint_dir}")
+                    return 1
+                if args.retry_failed:
+                    print(f"Queued {auditor.queue.reset_failed()} failed units again")
+            else:
+                regions = resolve_regions(args.regions, planner.enabled_regions())
+                auditor.create(regions, services, {
+                    'service_options': build_service_options(args),
+                    'tag_columns': build_tag_columns(args),
+                    'client_config': build_client_config(args),
+                    'breaker_threshold': args.breaker_threshold,
+                    'account_concurrency': args.account_concurrency
+                }, org_role=args.org_role, retry_denied=args.retry_denied)
+        elif args.org_role:
+            # Organization audits are not checkpointed, the report run id is the timestamp
+            regions = resolve_regions(args.regions, planner.enabled_regions())
+            run_id = timestamp
+            auditor = OrganizationAuditor(session, args.org_role, regions, services,
+                                          max_workers=ORG_MAX_WORKERS,
+                                          account_concurrency=args.account_concurrency,
+                                          breaker_threshold=args.breaker_threshold,
+                                          retry_denied=args.retry_denied,
+                                          auditor_options={
+                                              'service_options': build_service_options(args),
+                                              'tag_columns': build_tag_columns(args),
+                                              'snapshot_store': snapshot_store,
+                                              'client_config': build_client_config(args)
+                                          })
+        else:
+            if args.resume:
+                checkpoint = CheckpointStore(checkpoint_dir, args.resume)
+                if not checkpoint.exists():
+                    print(f"No checkpointed run {args.resume} in {checkpoint_dir}")
+                    return 1
+                manifest = checkpoint.load_manifest()
+                regions, services = manifest['regions'], manifest['services']
+            else:
+                regions = resolve_regions(args.regions, planner.enabled_regions())
+                checkpoint = CheckpointStore(checkpoint_dir, CheckpointStore.new_run_id())
+                checkpoint.save_manifest(regions, services)
+            run_id = checkpoint.run_id
+            print(f"Checkpoint run id: {run_id}")
+
+            auditor = AWSAuditor(session, regions, services, max_workers=DEFAULT_MAX_WORKERS,
+                                 service_options=build_service_options(args),
+                                 tag_columns=build_tag_columns(args),
+                                 snapshot_store=snapshot_store,
+                                 client_config=build_client_config(args),
+                                 circuit_breaker=CircuitBreaker(threshold=args.breaker_threshold))
+            auditor.exclude_units(planner.excluded_units(regions, services))
+            auditor.add_listener(planner.record_unit)
+            if args.resume:
+                units = checkpoint.load_units()
+                completed = {unit: data['result'] for unit, data in units.items() if 'error' not in data}
+                failed = [unit for unit, data in units.items() if 'error' in data]
+                auditor.restore_units(completed, rerun=failed if args.retry_failed else None)
+            auditor.add_listener(checkpoint.save_unit)
+
+        ndjson_writer = None
+        if 'ndjson' in formats:
+            # Lines are appended while the audit runs, so the file can be tailed
+            ndjson_writer = NDJSONWriter(os.path.join(args.output_dir, f'aws_inventory_{timestamp}.ndjson'),
+                                         compression=args.compression)
+            if isinstance(auditor, AWSAuditor):
+                account_id = session.client('sts').get_caller_identity()['Account']
+                auditor.add_listener(ndjson_writer.listener(account_id))
+            else:
+                auditor.add_listener(ndjson_writer.listener)
+            print(f"Streaming NDJSON inventory to: {ndjson_writer.path}")
+
+        try:
+            results = auditor.run_audit()
+        finally:
+            if ndjson_writer:
+                ndjson_path = ndjson_writer.close()
+                print(f"\nNDJSON inventory saved to: {ndjson_path} ({ndjson_writer.lines_written} lines)")
+            if snapshot_store:
+                snapshot_store.close()
+                print(f"\nSnapshot store: {snapshot_store.hits} unchanged, {snapshot_store.misses} new or changed resources")
+        
+        report_generator = ReportGenerator(results, args.output_dir, timestamp=timestamp,
+                                           row_group_size=args.row_group_size,
+                                           partition_by_region=args.partition_by_region,
+                                           run_id=run_id, sqlite_path=args.sqlite_db,
+                                           tag_columns=list(build_tag_columns(args).values()))
+        report_generator.generate_reports(formats)
         
     except Exception as e:
         print(f"Error during audit: {str(e)}")
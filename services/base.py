@@ -1,21 +1,40 @@
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import boto3
 from botocore.exceptions import ClientError
+from utils.client_pool import ClientPool
+from utils.snapshot import SnapshotStore
+from config.settings import DEFAULT_TAG_COLUMNS, REGION_DENIED_ERRORS
+from .tagging import TagIndex
 
 class AWSService(ABC):
-    def __init__(self, session: boto3.Session, region: str = None):
+    def __init__(self, session: boto3.Session, region: str = None, client_pool: ClientPool = None,
+                 tag_index: TagIndex = None, tag_columns: Dict[str, str] = None,
+                 snapshot_store: SnapshotStore = None):
         self.session = session
         self.region = region
+        self.client_pool = client_pool or ClientPool(session)
+        self.tag_index = tag_index
+        self.tag_columns = DEFAULT_TAG_COLUMNS if tag_columns is None else tag_columns
+        self.snapshot_store = snapshot_store
         self.client = self._get_client()
 
     def _get_client(self):
-        """Create boto3 client for the service"""
-        return self.session.client(
+        """Get the shared boto3 client for the service from the client pool"""
+        return self.client_pool.get_client(
             self.service_name,
-            region_name=self.region if self.region else None
+            self.region if self.region else None
         )
 
+    def _is_denied(self, error: Exception) -> bool:
+        """Whether the error closes the whole service in this region to the account
+
+        Collectors re-raise these rather than report an empty region, so the unit fails with
+        its error code and the region planner can skip it on later runs.
+        """
+        return (isinstance(error, ClientError)
+                and error.response.get('Error', {}).get('Code') in REGION_DENIED_ERRORS)
+
     @property
     @abstractmethod
     def service_name(self) -> str:
@@ -27,6 +46,24 @@ class AWSService(ABC):
         """Perform audit of the service and return results"""
         pass
 
+    def _get_tags(self, arn: str) -> Optional[Dict[str, str]]:
+        """Look up tags in the region's tag index, None when no index is available"""
+        return self.tag_index.get(arn) if self.tag_index else None
+
+    def _tag_columns(self, tags: Dict[str, str]) -> Dict[str, str]:
+        """Map the configured tag keys onto their report columns"""
+        return {column: tags.get(key, 'N/A') for key, column in self.tag_columns.items()}
+
+    def _load_snapshot(self, resource_id: str, marker: Any) -> Optional[Any]:
+        """Return stored enrichment for an unchanged resource in incremental mode"""
+        if not self.snapshot_store:
+            return None
+        return self.snapshot_store.get(self.service_name, resource_id, marker)
+
+    def _save_snapshot(self, resource_id: str, marker: Any, data: Any):
+        if self.snapshot_store:
+            self.snapshot_store.put(self.service_name, resource_id, marker, data)
+
     def handle_client_error(self, e: ClientError, resource: str) -> Dict[str, str]:
         """Handle and format AWS client errors"""
         return {
@@ -1,27 +1,61 @@
 from typing import Dict, List, Any
+import boto3
+from utils.exceptions import CircuitOpenError
 from .base import AWSService
 from botocore.exceptions import EndpointConnectionError, ClientError
+from utils.cache import DiskCache
+from config.settings import BEDROCK_CACHE_TTL
 
 class BedrockService(AWSService):
+    def __init__(self, session: boto3.Session, region: str = None, refresh_cache: bool = False,
+                 cache: DiskCache = None, **kwargs):
+        super().__init__(session, region, **kwargs)
+        # The foundation model catalog is the same for every account, so the cache is keyed by region only
+        self.cache = cache or DiskCache('bedrock', ttl=BEDROCK_CACHE_TTL, refresh=refresh_cache)
+
     @property
     def service_name(self) -> str:
         return 'bedrock'
 
     def audit(self) -> List[Dict[str, Any]]:
         try:
-            models = self.client.list_foundation_models()
-            return [self._get_model_details(model) for model in models['modelSummaries'] 
-                   if self._get_model_details(model)]
-        except (EndpointConnectionError, ClientError):
+            self.cache.evict()
+            models = self.cache.get_or_set(
+                f"{self.region}/list_foundation_models",
+                lambda: self._strip_metadata(self.client.list_foundation_models())
+            )
+
+            resources = []
+            described = set()
+            for model in models['modelSummaries']:
+                if model['modelId'] in described:
+                    continue
+                described.add(model['modelId'])
+                model_details = self._get_model_details(model)
+                if model_details:
+                    resources.append(model_details)
+            return resources
+        except (EndpointConnectionError, ClientError) as e:
+            if self._is_denied(e):
+                raise
             # Service not available in this region
             return []
+        except CircuitOpenError:
+            raise
         except Exception as e:
             print(f"Unexpected error in Bedrock audit: {str(e)}")
             return []
 
+    def _strip_metadata(self, response: Dict[str, Any]) -> Dict[str, Any]:
+        return {k: v for k, v in response.items() if k != 'ResponseMetadata'}
+
     def _get_model_details(self, model: Dict[str, Any]) -> Dict[str, Any]:
         try:
-            model_details = self.client.get_foundation_model(modelIdentifier=model['modelId'])
+            response = self.cache.get_or_set(
+                f"{self.region}/get_foundation_model/{model['modelId']}",
+                lambda: self._strip_metadata(self.client.get_foundation_model(modelIdentifier=model['modelId']))
+            )
+            model = {**model, **response.get('modelDetails', {})}
             return {
                 'Region': self.region,
                 'Model ID': model['modelId'],
@@ -37,5 +71,7 @@ class BedrockService(AWSService):
                 'Created At': str(model.get('createdAt', 'N/A')),
                 'Last Modified': str(model.get('lastModifiedAt', 'N/A'))
             }
+        except CircuitOpenError:
+            raise
         except Exception:
-            return None
\ No newline at end of file
+            return None
@@ -1,4 +1,5 @@
 from typing import Dict, List, Any
+from utils.exceptions import CircuitOpenError
 from .base import AWSService
 
 class ConfigService(AWSService):
@@ -35,7 +36,11 @@ class ConfigService(AWSService):
                 'Aggregator Details': aggregators
             })
             
+        except CircuitOpenError:
+            raise
         except Exception as e:
+            if self._is_denied(e):
+                raise
             print(f"Error auditing Config in {self.region}: {str(e)}")
             
         return resources
\ No newline at end of file
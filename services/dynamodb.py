@@ -1,56 +1,137 @@
 from typing import Dict, List, Any
+from concurrent.futures import Future, ThreadPoolExecutor
+import boto3
+from utils.exceptions import CircuitOpenError
 from .base import AWSService
+from .records import DynamoDBTable
+from utils.rate_limit import TokenBucket
+from config.settings import DYNAMODB_DESCRIBE_WORKERS, DYNAMODB_THROTTLED_WORKERS, DYNAMODB_THROTTLED_RATE
 
 class DynamoDBService(AWSService):
+    def __init__(self, session: boto3.Session, region: str = None,
+                 describe_workers: int = DYNAMODB_DESCRIBE_WORKERS,
+                 throttled_workers: int = DYNAMODB_THROTTLED_WORKERS,
+                 throttled_rate: float = DYNAMODB_THROTTLED_RATE, **kwargs):
+        self.describe_workers = describe_workers
+        super().__init__(session, region, **kwargs)
+        self.throttled_workers = throttled_workers
+        self.throttled_limit = TokenBucket(throttled_rate)
+
     @property
     def service_name(self) -> str:
         return 'dynamodb'
 
+    def _get_client(self):
+        return self.client_pool.get_client(self.service_name, self.region,
+                                           max_pool_connections=self.describe_workers)
+
     def audit(self) -> List[Dict[str, Any]]:
-        resources = []
-        paginator = self.client.get_paginator('list_tables')
-        
-        for page in paginator.paginate():
-            for table_name in page['TableNames']:
-                table_details = self._get_table_details(table_name)
+        # describe_table runs wide; each described table is handed straight to the
+        # narrow, rate limited lane for the calls with low control plane limits
+        with ThreadPoolExecutor(max_workers=self.throttled_workers) as throttled_pool:
+            with ThreadPoolExecutor(max_workers=self.describe_workers) as describe_pool:
+                futures = []
+                paginator = self.client.get_paginator('list_tables')
+                for page in paginator.paginate():
+                    for table_name in page['TableNames']:
+                        futures.append(describe_pool.submit(self._describe_table, table_name, throttled_pool))
+
+            resources = []
+            for future in futures:
+                table_future = future.result()
+                table_details = table_future.result() if table_future else None
                 if table_details:
                     resources.append(table_details)
                     
         return resources
 
-    def _get_table_details(self, table_name: str) -> Dict[str, Any]:
+    def _describe_table(self, table_name: str, throttled_pool: ThreadPoolExecutor) -> Future:
         try:
             table = self.client.describe_table(TableName=table_name)['Table']
-            tags = self.client.list_tags_of_resource(ResourceArn=table['TableArn'])
-            backup_status = self._get_backup_status(table_name)
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            print(f"Error processing table {table_name}: {str(e)}")
+            return None
+
+        # In incremental mode unchanged tables skip the throttled lane until their snapshot
+        # expires, since point-in-time recovery can be switched without changing the table
+        enrichment = self._load_snapshot(table['TableArn'], self._snapshot_marker(table))
+        if enrichment is not None:
+            tags = self._get_tags(table['TableArn'])
+            if tags is not None:
+                enrichment['tags'] = tags
+            done = Future()
+            done.set_result(self._get_table_details(table, enrichment))
+            return done
+        return throttled_pool.submit(self._get_table_details, table)
+
+    def _snapshot_marker(self, table: Dict[str, Any]) -> List[Any]:
+        return [table['TableStatus'], table.get('TableSizeBytes', 0)]
+
+    def _get_table_details(self, table: Dict[str, Any], enrichment: Dict[str, Any] = None) -> Dict[str, Any]:
+        try:
+            if enrichment is None:
+                enrichment = {
+                    'tags': self._get_table_tags(table['TableArn']),
+                    'backup_status': self._get_backup_status(table['TableName'])
+                }
+                self._save_snapshot(table['TableArn'], self._snapshot_marker(table), enrichment)
+            tags = enrichment['tags']
+            backup_status = enrichment['backup_status']
+            global_indexes = table.get('GlobalSecondaryIndexes', [])
+            local_indexes = table.get('LocalSecondaryIndexes', [])
             
-            return {
+            return DynamoDBTable({
                 'Region': self.region,
                 'Table Name': table['TableName'],
                 'ARN': table['TableArn'],
                 'Status': table['TableStatus'],
-                'Creation Time': str(table['CreationDateTime']),
+                'Creation Time': table['CreationDateTime'],
                 'Item Count': table.get('ItemCount', 0),
                 'Size (Bytes)': table.get('TableSizeBytes', 0),
                 'Billing Mode': table.get('BillingModeSummary', {}).get('BillingMode', 'PROVISIONED'),
-                'Read Capacity': table.get('ProvisionedThroughput', {}).get('ReadCapacityUnits', 'N/A'),
-                'Write Capacity': table.get('ProvisionedThroughput', {}).get('WriteCapacityUnits', 'N/A'),
+                'Read Capacity': table.get('ProvisionedThroughput', {}).get('ReadCapacityUnits'),
+                'Write Capacity': table.get('ProvisionedThroughput', {}).get('WriteCapacityUnits'),
                 'Point-in-Time Recovery': backup_status,
                 'Stream Enabled': table.get('StreamSpecification', {}).get('StreamEnabled', False),
-                'Encryption Type': table.get('SSEDescription', {}).get('SSEType', 'N/A'),
+                'Encryption Type': table.get('SSEDescription', {}).get('SSEType'),
                 'Global Table': bool(table.get('GlobalTableVersion', False)),
-                'Tags': self._format_tags(tags.get('Tags', []))
-            }
+                'GSI Count': len(global_indexes),
+                'GSI Size (Bytes)': sum(index.get('IndexSizeBytes', 0) for index in global_indexes),
+                'LSI Count': len(local_indexes),
+                'LSI Size (Bytes)': sum(index.get('IndexSizeBytes', 0) for index in local_indexes),
+                'Replicas': ', '.join([f"{replica['RegionName']} ({replica.get('ReplicaStatus', 'N/A')})"
+                                       for replica in table.get('Replicas', [])]) or None,
+                'Tags': self._format_tags(tags),
+                **self._tag_columns(tags)
+            })
+        except CircuitOpenError:
+            raise
         except Exception as e:
-            print(f"Error processing table {table_name}: {str(e)}")
+            print(f"Error processing table {table['TableName']}: {str(e)}")
             return None
 
+    def _get_table_tags(self, table_arn: str) -> Dict[str, str]:
+        tags = self._get_tags(table_arn)
+        if tags is not None:
+            return tags
+        tags = {}
+        self.throttled_limit.acquire()
+        paginator = self.client.get_paginator('list_tags_of_resource')
+        for page in paginator.paginate(ResourceArn=table_arn):
+            tags.update({tag['Key']: tag['Value'] for tag in page.get('Tags', [])})
+        return tags
+
     def _get_backup_status(self, table_name: str) -> str:
         try:
+            self.throttled_limit.acquire()
             response = self.client.describe_continuous_backups(TableName=table_name)
             return response['ContinuousBackupsDescription']['PointInTimeRecoveryDescription']['PointInTimeRecoveryStatus']
+        except CircuitOpenError:
+            raise
         except:
             return 'DISABLED'
 
-    def _format_tags(self, tags: List[Dict[str, str]]) -> str:
-        return ', '.join([f"{tag['Key']}={tag['Value']}" for tag in tags])
\ No newline at end of file
+    def _format_tags(self, tags: Dict[str, str]) -> str:
+        return ', '.join([f"{k}={v}" for k, v in tags.items()])
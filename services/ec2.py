@@ -1,5 +1,7 @@
 from typing import Dict, List, Any
+from utils.exceptions import CircuitOpenError
 from .base import AWSService
+from .records import EC2Instance
 
 class EC2Service(AWSService):
     @property
@@ -10,6 +12,8 @@ class EC2Service(AWSService):
         try:
             eips = self.client.describe_addresses()['Addresses']
             return {eip.get('InstanceId'): eip for eip in eips if eip.get('InstanceId')}
+        except CircuitOpenError:
+            raise
         except Exception:
             return {}
 
@@ -24,25 +28,23 @@ class EC2Service(AWSService):
                     eip_info = eip_map.get(instance['InstanceId'], {})
                     tags = {tag['Key']: tag['Value'] for tag in instance.get('Tags', [])}
                     
-                    resources.append({
+                    resources.append(EC2Instance({
                         'Region': self.region,
                         'Instance ID': instance['InstanceId'],
-                        'Name': tags.get('Name', 'N/A'),
+                        'Name': tags.get('Name'),
                         'State': instance['State']['Name'],
                         'Instance Type': instance['InstanceType'],
                         'Platform': instance.get('Platform', 'linux'),
-                        'Private IP': instance.get('PrivateIpAddress', 'N/A'),
-                        'Public IP': instance.get('PublicIpAddress', 'N/A'),
-                        'Elastic IP': eip_info.get('PublicIp', 'N/A'),
-                        'EIP Allocation ID': eip_info.get('AllocationId', 'N/A'),
-                        'VPC ID': instance.get('VpcId', 'N/A'),
-                        'Subnet ID': instance.get('SubnetId', 'N/A'),
-                        'Key Name': instance.get('KeyName', 'N/A'),
-                        'Launch Time': str(instance.get('LaunchTime', 'N/A')),
+                        'Private IP': instance.get('PrivateIpAddress'),
+                        'Public IP': instance.get('PublicIpAddress'),
+                        'Elastic IP': eip_info.get('PublicIp'),
+                        'EIP Allocation ID': eip_info.get('AllocationId'),
+                        'VPC ID': instance.get('VpcId'),
+                        'Subnet ID': instance.get('SubnetId'),
+                        'Key Name': instance.get('KeyName'),
+                        'Launch Time': instance.get('LaunchTime'),
                         'Security Groups': ', '.join([sg['GroupId'] for sg in instance.get('SecurityGroups', [])]),
-                        'Environment': tags.get('Environment', 'N/A'),
-                        'Owner': tags.get('Owner', 'N/A'),
-                        'Cost Center': tags.get('CostCenter', 'N/A')
-                    })
+                        **self._tag_columns(tags)
+                    }))
         
         return resources
\ No newline at end of file
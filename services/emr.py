@@ -1,31 +1,66 @@
 from typing import Dict, List, Any
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+import boto3
 from .base import AWSService
 from botocore.exceptions import ClientError
+from config.settings import EMR_DETAIL_WORKERS
 
 class EMRService(AWSService):
+    def __init__(self, session: boto3.Session, region: str = None, cluster_states: List[str] = None,
+                 created_after_days: int = None, detail_workers: int = EMR_DETAIL_WORKERS, **kwargs):
+        super().__init__(session, region, **kwargs)
+        self.cluster_states = cluster_states
+        self.created_after_days = created_after_days
+        self.detail_workers = detail_workers
+
     @property
     def service_name(self) -> str:
         return 'emr'
 
     def audit(self) -> List[Dict[str, Any]]:
+        # State and creation time are filtered server side so dead clusters are never listed
+        filters = {}
+        if self.cluster_states:
+            filters['ClusterStates'] = self.cluster_states
+        if self.created_after_days:
+            filters['CreatedAfter'] = datetime.now(timezone.utc) - timedelta(days=self.created_after_days)
+
         try:
+            futures = []
+            with ThreadPoolExecutor(max_workers=self.detail_workers) as executor:
+                paginator = self.client.get_paginator('list_clusters')
+                for page in paginator.paginate(**filters):
+                    for cluster in page['Clusters']:
+                        futures.append(executor.submit(
+                            self._get_cluster_details, cluster['Id'], cluster.get('ClusterArn')))
+
             clusters = []
-            paginator = self.client.get_paginator('list_clusters')
-            for page in paginator.paginate():
-                for cluster in page['Clusters']:
-                    cluster_detail = self._get_cluster_details(cluster['Id'])
-                    if cluster_detail:
-                        clusters.append(cluster_detail)
+            for future in futures:
+                cluster_detail = future.result()
+                if cluster_detail:
+                    clusters.append(cluster_detail)
             return clusters
         except ClientError as e:
+            if self._is_denied(e):
+                raise
             print(f"Error auditing EMR in {self.region}: {str(e)}")
             return []
 
-    def _get_cluster_details(self, cluster_id: str) -> Dict[str, Any]:
+    def _get_cluster_details(self, cluster_id: str, cluster_arn: str = None) -> Dict[str, Any]:
         try:
             cluster = self.client.describe_cluster(ClusterId=cluster_id)['Cluster']
-            instances = self.client.list_instances(ClusterId=cluster_id)['Instances']
-            steps = self.client.list_steps(ClusterId=cluster_id)['Steps']
+            tags = self._get_tags(cluster_arn or cluster.get('ClusterArn'))
+            if tags is None:
+                tags = {tag['Key']: tag['Value'] for tag in cluster.get('Tags', [])}
+
+            if cluster.get('InstanceCollectionType') == 'INSTANCE_FLEET':
+                instance_groups = [self._format_instance_fleet(fleet) for fleet in
+                                   self._list_all('list_instance_fleets', 'InstanceFleets', cluster_id)]
+            else:
+                instance_groups = [self._format_instance_group(group) for group in
+                                   self._list_all('list_instance_groups', 'InstanceGroups', cluster_id)]
+            steps = [self._format_step(step) for step in self._list_all('list_steps', 'Steps', cluster_id)]
 
             return {
                 'Region': self.region,
@@ -36,9 +71,9 @@ class EMRService(AWSService):
                 'Creation Time': str(cluster.get('Status', {}).get('Timeline', {}).get('CreationDateTime', 'N/A')),
                 'End Time': str(cluster.get('Status', {}).get('Timeline', {}).get('EndDateTime', 'N/A')),
                 'Applications': [app['Name'] + ' ' + app['Version'] for app in cluster.get('Applications', [])],
-                'Instance Count': len(instances),
-                'Master Type': cluster.get('InstanceGroups', [{}])[0].get('InstanceType', 'N/A'),
-                'Core Type': cluster.get('InstanceGroups', [{}, {}])[1].get('InstanceType', 'N/A') if len(cluster.get('InstanceGroups', [])) > 1 else 'N/A',
+                'Instance Count': sum(group['Running Count'] for group in instance_groups),
+                'Master Type': self._instance_type(instance_groups, 'MASTER'),
+                'Core Type': self._instance_type(instance_groups, 'CORE'),
                 'Step Count': len(steps),
                 'Auto Terminate': cluster.get('AutoTerminate', False),
                 'Termination Protected': cluster.get('TerminationProtected', False),
@@ -47,7 +82,58 @@ class EMRService(AWSService):
                 'Subnet ID': cluster.get('Ec2InstanceAttributes', {}).get('Ec2SubnetId', 'N/A'),
                 'Security Groups': ', '.join(cluster.get('Ec2InstanceAttributes', {}).get('EmrManagedMasterSecurityGroup', [])),
                 'Service Role': cluster.get('ServiceRole', 'N/A'),
-                'Tags': str(cluster.get('Tags', {}))
+                'Tags': str(tags),
+                **self._tag_columns(tags),
+                'Instance Groups': instance_groups,
+                'Steps': steps
             }
         except ClientError:
-            return None
\ No newline at end of file
+            return None
+
+    def _list_all(self, operation: str, key: str, cluster_id: str) -> List[Dict[str, Any]]:
+        items = []
+        paginator = self.client.get_paginator(operation)
+        for page in paginator.paginate(ClusterId=cluster_id):
+            items.extend(page.get(key, []))
+        return items
+
+    def _instance_type(self, instance_groups: List[Dict[str, Any]], group_type: str) -> str:
+        return next((group['Instance Type'] for group in instance_groups
+                     if group['Type'] == group_type), 'N/A')
+
+    def _format_instance_group(self, group: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'Instance Group ID': group['Id'],
+            'Name': group.get('Name', 'N/A'),
+            'Type': group.get('InstanceGroupType', 'N/A'),
+            'Market': group.get('Market', 'N/A'),
+            'Instance Type': group.get('InstanceType', 'N/A'),
+            'Requested Count': group.get('RequestedInstanceCount', 0),
+            'Running Count': group.get('RunningInstanceCount', 0),
+            'State': group.get('Status', {}).get('State', 'N/A')
+        }
+
+    def _format_instance_fleet(self, fleet: Dict[str, Any]) -> Dict[str, Any]:
+        # Fleet capacity is reported in units, which equal instances unless weights are configured
+        instance_types = [spec['InstanceType'] for spec in fleet.get('InstanceTypeSpecifications', [])]
+        return {
+            'Instance Group ID': fleet['Id'],
+            'Name': fleet.get('Name', 'N/A'),
+            'Type': fleet.get('InstanceFleetType', 'N/A'),
+            'Market': 'FLEET',
+            'Instance Type': ', '.join(instance_types) if instance_types else 'N/A',
+            'Requested Count': fleet.get('TargetOnDemandCapacity', 0) + fleet.get('TargetSpotCapacity', 0),
+            'Running Count': fleet.get('ProvisionedOnDemandCapacity', 0) + fleet.get('ProvisionedSpotCapacity', 0),
+            'State': fleet.get('Status', {}).get('State', 'N/A')
+        }
+
+    def _format_step(self, step: Dict[str, Any]) -> Dict[str, Any]:
+        timeline = step.get('Status', {}).get('Timeline', {})
+        return {
+            'Step ID': step['Id'],
+            'Name': step.get('Name', 'N/A'),
+            'State': step.get('Status', {}).get('State', 'N/A'),
+            'Action On Failure': step.get('ActionOnFailure', 'N/A'),
+            'Creation Time': str(timeline.get('CreationDateTime', 'N/A')),
+            'End Time': str(timeline.get('EndDateTime', 'N/A'))
+        }
@@ -1,44 +1,129 @@
 from typing import Dict, List, Any
+from datetime import datetime
+import csv
+import io
+import time
+import boto3
+from botocore.exceptions import ClientError
+from utils.exceptions import CircuitOpenError
 from .base import AWSService
+from config.settings import CREDENTIAL_REPORT_POLL_SECONDS, CREDENTIAL_REPORT_MAX_POLLS
 
 class IAMService(AWSService):
+    def __init__(self, session: boto3.Session, region: str = None, mode: str = 'bulk', **kwargs):
+        super().__init__(session, region, **kwargs)
+        self.mode = mode
+
     @property
     def service_name(self) -> str:
         return 'iam'
 
     def audit(self) -> Dict[str, List[Dict[str, Any]]]:
+        if self.mode == 'bulk':
+            try:
+                return self._audit_bulk()
+            except ClientError as e:
+                print(f"Bulk IAM snapshot unavailable, falling back to per-principal calls: {str(e)}")
+
         return {
             'users': self._audit_users(),
             'roles': self._audit_roles(),
             'groups': self._audit_groups()
         }
 
+    def _audit_bulk(self) -> Dict[str, List[Dict[str, Any]]]:
+        users, groups = self._get_authorization_details()
+        credentials = self._get_credential_report()
+
+        user_rows = []
+        members = {group['GroupName']: [] for group in groups}
+        for user in users:
+            for group_name in user.get('GroupList', []):
+                members.setdefault(group_name, []).append(user['UserName'])
+
+            report = credentials.get(user['UserName'])
+            if report:
+                user_rows.append(self._format_report_user(user, report))
+            else:
+                # The credential report can be up to four hours old, so newer users are looked up directly
+                user_rows.append(self._format_user(user))
+
+        return {
+            'users': user_rows,
+            # GetAccountAuthorizationDetails omits role descriptions and session durations
+            'roles': self._audit_roles(),
+            'groups': [self._format_group(group, members[group['GroupName']]) for group in groups]
+        }
+
+    def _get_authorization_details(self):
+        users, groups = [], []
+        paginator = self.client.get_paginator('get_account_authorization_details')
+        for page in paginator.paginate(Filter=['User', 'Group']):
+            users.extend(page.get('UserDetailList', []))
+            groups.extend(page.get('GroupDetailList', []))
+        return users, groups
+
+    def _get_credential_report(self) -> Dict[str, Dict[str, str]]:
+        for _ in range(CREDENTIAL_REPORT_MAX_POLLS):
+            if self.client.generate_credential_report()['State'] == 'COMPLETE':
+                break
+            time.sleep(CREDENTIAL_REPORT_POLL_SECONDS)
+
+        content = self.client.get_credential_report()['Content']
+        reader = csv.DictReader(io.TextIOWrapper(io.BytesIO(content), encoding='utf-8'))
+        return {row['user']: row for row in reader if row['user'] != '<root_account>'}
+
+    def _format_report_user(self, user: Dict[str, Any], report: Dict[str, str]) -> Dict[str, Any]:
+        active_keys = [n for n in ('1', '2') if report.get(f'access_key_{n}_active') == 'true']
+        active_key_last_used = [self._report_date(report.get(f'access_key_{n}_last_used_date'))
+                                for n in active_keys]
+
+        return {
+            'UserName': user['UserName'],
+            'UserId': user['UserId'],
+            'ARN': user['Arn'],
+            'Created': str(user['CreateDate']),
+            'PasswordLastUsed': self._report_date(report.get('password_last_used')),
+            'AccessKeysActive': len(active_keys),
+            'AccessKeysLastUsed': ', '.join(active_key_last_used) if active_key_last_used else 'N/A',
+            'MFAEnabled': report.get('mfa_active') == 'true',
+            'GroupMemberships': ', '.join(user.get('GroupList', []))
+        }
+
+    def _report_date(self, value: str) -> str:
+        if not value or value in ('N/A', 'no_information', 'not_supported'):
+            return 'Never'
+        return str(datetime.fromisoformat(value.replace('Z', '+00:00')))
+
     def _audit_users(self) -> List[Dict[str, Any]]:
         users = []
         paginator = self.client.get_paginator('list_users')
         
         for page in paginator.paginate():
             for user in page['Users']:
-                access_keys = self.client.list_access_keys(UserName=user['UserName'])['AccessKeyMetadata']
-                mfa_devices = self.client.list_mfa_devices(UserName=user['UserName'])['MFADevices']
-                groups = self.client.list_groups_for_user(UserName=user['UserName'])['Groups']
-                
-                active_key_last_used = self._get_key_last_used(access_keys)
-                
-                users.append({
-                    'UserName': user['UserName'],
-                    'UserId': user['UserId'],
-                    'ARN': user['Arn'],
-                    'Created': str(user['CreateDate']),
-                    'PasswordLastUsed': str(user.get('PasswordLastUsed', 'Never')),
-                    'AccessKeysActive': len([k for k in access_keys if k['Status'] == 'Active']),
-                    'AccessKeysLastUsed': ', '.join(active_key_last_used) if active_key_last_used else 'N/A',
-                    'MFAEnabled': len(mfa_devices) > 0,
-                    'GroupMemberships': ', '.join([g['GroupName'] for g in groups])
-                })
+                users.append(self._format_user(user))
                 
         return users
 
+    def _format_user(self, user: Dict[str, Any]) -> Dict[str, Any]:
+        access_keys = self.client.list_access_keys(UserName=user['UserName'])['AccessKeyMetadata']
+        mfa_devices = self.client.list_mfa_devices(UserName=user['UserName'])['MFADevices']
+        groups = self.client.list_groups_for_user(UserName=user['UserName'])['Groups']
+        
+        active_key_last_used = self._get_key_last_used(access_keys)
+        
+        return {
+            'UserName': user['UserName'],
+            'UserId': user['UserId'],
+            'ARN': user['Arn'],
+            'Created': str(user['CreateDate']),
+            'PasswordLastUsed': str(user.get('PasswordLastUsed', 'Never')),
+            'AccessKeysActive': len([k for k in access_keys if k['Status'] == 'Active']),
+            'AccessKeysLastUsed': ', '.join(active_key_last_used) if active_key_last_used else 'N/A',
+            'MFAEnabled': len(mfa_devices) > 0,
+            'GroupMemberships': ', '.join([g['GroupName'] for g in groups])
+        }
+
     def _get_key_last_used(self, access_keys: List[Dict[str, Any]]) -> List[str]:
         last_used = []
         for key in access_keys:
@@ -47,6 +132,8 @@ class IAMService(AWSService):
                     key_info = self.client.get_access_key_last_used(AccessKeyId=key['AccessKeyId'])
                     last_used_date = key_info.get('AccessKeyLastUsed', {}).get('LastUsedDate', 'Never')
                     last_used.append(str(last_used_date))
+                except CircuitOpenError:
+                    raise
                 except Exception:
                     last_used.append('Error getting last used date')
         return last_used
@@ -76,16 +163,22 @@ class IAMService(AWSService):
         
         for page in paginator.paginate():
             for group in page['Groups']:
-                members = self.client.get_group(GroupName=group['GroupName'])['Users']
+                members = []
+                member_paginator = self.client.get_paginator('get_group')
+                for member_page in member_paginator.paginate(GroupName=group['GroupName']):
+                    members.extend(u['UserName'] for u in member_page['Users'])
                 
-                groups.append({
-                    'GroupName': group['GroupName'],
-                    'GroupId': group['GroupId'],
-                    'ARN': group['Arn'],
-                    'Created': str(group['CreateDate']),
-                    'MemberCount': len(members),
-                    'Members': ', '.join([u['UserName'] for u in members]),
-                    'Path': group.get('Path', '/')
-                })
+                groups.append(self._format_group(group, members))
                 
-        return groups
\ No newline at end of file
+        return groups
+
+    def _format_group(self, group: Dict[str, Any], members: List[str]) -> Dict[str, Any]:
+        return {
+            'GroupName': group['GroupName'],
+            'GroupId': group['GroupId'],
+            'ARN': group['Arn'],
+            'Created': str(group['CreateDate']),
+            'MemberCount': len(members),
+            'Members': ', '.join(members),
+            'Path': group.get('Path', '/')
+        }
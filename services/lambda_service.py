@@ -1,64 +1,137 @@
 from typing import Dict, List, Any
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from threading import BoundedSemaphore
 import json
+import boto3
+from utils.exceptions import CircuitOpenError
 from .base import AWSService
+from .records import LambdaFunction
+from config.settings import LAMBDA_ENRICHMENT_FIELDS, LAMBDA_ENRICHMENT_WORKERS
+
+NOT_COLLECTED = 'Not collected'
+# Lambda returns LastModified as e.g. 2024-01-31T12:00:00.000+0000
+LAST_MODIFIED_FORMAT = '%Y-%m-%dT%H:%M:%S.%f%z'
 
 class LambdaService(AWSService):
+    def __init__(self, session: boto3.Session, region: str = None, enrich_fields: List[str] = None,
+                 max_workers: int = LAMBDA_ENRICHMENT_WORKERS, **kwargs):
+        self.max_workers = max_workers
+        super().__init__(session, region, **kwargs)
+        self.enrich_fields = set(LAMBDA_ENRICHMENT_FIELDS if enrich_fields is None else enrich_fields)
+
     @property
     def service_name(self) -> str:
         return 'lambda'
 
+    def _get_client(self):
+        return self.client_pool.get_client(self.service_name, self.region,
+                                           max_pool_connections=self.max_workers)
+
     def audit(self) -> List[Dict[str, Any]]:
-        resources = []
         paginator = self.client.get_paginator('list_functions')
-        
-        for page in paginator.paginate():
-            for function in page['Functions']:
-                function_details = self._get_function_details(function)
-                if function_details:
-                    resources.append(function_details)
-                    
-        return resources
+
+        if not self.enrich_fields:
+            resources = []
+            for page in paginator.paginate():
+                for function in page['Functions']:
+                    function_details = self._get_function_details(function)
+                    if function_details:
+                        resources.append(function_details)
+            return resources
+
+        # Functions are enriched as the listing pages arrive; the semaphore bounds
+        # how far the listing can run ahead of the workers
+        in_flight = BoundedSemaphore(self.max_workers * 4)
+        futures = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for page in paginator.paginate():
+                for function in page['Functions']:
+                    in_flight.acquire()
+                    future = executor.submit(self._get_function_details, function)
+                    future.add_done_callback(lambda _: in_flight.release())
+                    futures.append(future)
+
+        # Collected in listing order so the output is deterministic
+        resources = [future.result() for future in futures]
+        return [function_details for function_details in resources if function_details]
 
     def _get_function_details(self, function: Dict) -> Dict[str, Any]:
         try:
-            policy = self._get_function_policy(function['FunctionName'])
-            tags = self._get_function_tags(function['FunctionArn'])
-            concurrency = self._get_function_concurrency(function['FunctionName'])
+            enrichment = self._get_enrichment(function)
+            policy = enrichment['policy']
+            tags = enrichment['tags']
+            concurrency = enrichment['concurrency']
             
-            return {
+            return LambdaFunction({
                 'Region': self.region,
                 'Function Name': function['FunctionName'],
                 'ARN': function['FunctionArn'],
                 'Runtime': function['Runtime'],
                 'Handler': function['Handler'],
-                'Code Size': f"{function['CodeSize'] / (1024*1024):.2f} MB",
-                'Memory': f"{function['MemorySize']} MB",
-                'Timeout': f"{function['Timeout']} seconds",
-                'Last Modified': function['LastModified'],
+                'Code Size': function['CodeSize'],
+                'Memory': function['MemorySize'] * 1024 * 1024,
+                'Timeout': function['Timeout'],
+                'Last Modified': datetime.strptime(function['LastModified'], LAST_MODIFIED_FORMAT),
                 'Environment Variables': len(function.get('Environment', {}).get('Variables', {})),
                 'Layers': len(function.get('Layers', [])),
                 'VPC Config': bool(function.get('VpcConfig', {}).get('VpcId')),
-                'VPC ID': function.get('VpcConfig', {}).get('VpcId', 'N/A'),
+                'VPC ID': function.get('VpcConfig', {}).get('VpcId') or None,
                 'Reserved Concurrency': concurrency,
                 'Architecture': function.get('Architectures', ['x86_64'])[0],
                 'Package Type': function.get('PackageType', 'Zip'),
-                'Resource Policy': bool(policy),
-                'Tags': self._format_tags(tags)
-            }
+                'Resource Policy': policy if policy is not None else NOT_COLLECTED,
+                'Tags': self._format_tags(tags) if tags is not None else NOT_COLLECTED,
+                **self._tag_columns(tags or {})
+            })
+        except CircuitOpenError:
+            raise
         except Exception as e:
             print(f"Error processing Lambda function {function['FunctionName']}: {str(e)}")
             return None
 
+    def _get_enrichment(self, function: Dict) -> Dict[str, Any]:
+        # In incremental mode the per-function calls are only made for new or changed functions.
+        # Permission and concurrency changes do not touch LastModified, so snapshots also expire.
+        marker = [function['LastModified'], function.get('CodeSha256'), function.get('RevisionId'),
+                  sorted(self.enrich_fields)]
+        enrichment = self._load_snapshot(function['FunctionArn'], marker)
+        if enrichment is not None:
+            if 'tags' in self.enrich_fields:
+                # Tags change without touching the function, and the tag index lookup is free
+                tags = self._get_tags(function['FunctionArn'])
+                if tags is not None:
+                    enrichment['tags'] = tags
+            return enrichment
+
+        enrichment = {
+            'policy': (bool(self._get_function_policy(function['FunctionName']))
+                       if 'policy' in self.enrich_fields else None),
+            'tags': self._get_function_tags(function['FunctionArn']) if 'tags' in self.enrich_fields else None,
+            'concurrency': (self._get_function_concurrency(function['FunctionName'])
+                            if 'concurrency' in self.enrich_fields else NOT_COLLECTED)
+        }
+        if enrichment['concurrency'] != 'Error retrieving':
+            self._save_snapshot(function['FunctionArn'], marker, enrichment)
+        return enrichment
+
     def _get_function_policy(self, function_name: str) -> Dict:
         try:
             policy = self.client.get_policy(FunctionName=function_name)
             return json.loads(policy['Policy'])
+        except CircuitOpenError:
+            raise
         except:
             return {}
 
     def _get_function_tags(self, function_arn: str) -> Dict:
+        tags = self._get_tags(function_arn)
+        if tags is not None:
+            return tags
         try:
             return self.client.list_tags(Resource=function_arn)['Tags']
+        except CircuitOpenError:
+            raise
         except:
             return {}
 
@@ -67,8 +140,10 @@ class LambdaService(AWSService):
             return self.client.get_function_concurrency(
                 FunctionName=function_name
             ).get('ReservedConcurrentExecutions', 'Not configured')
+        except CircuitOpenError:
+            raise
         except:
             return 'Error retrieving'
 
     def _format_tags(self, tags: Dict) -> str:
-        return ', '.join([f"{k}={v}" for k, v in tags.items()]) if tags else 'No Tags'
\ No newline at end of file
+        return ', '.join([f"{k}={v}" for k, v in tags.items()]) if tags else 'No Tags'
@@ -1,4 +1,5 @@
 from typing import Dict, List, Any
+from utils.exceptions import CircuitOpenError
 from .base import AWSService
 from botocore.exceptions import ClientError
 
@@ -23,10 +24,17 @@ class LightsailService(AWSService):
             resources.extend(containers)
             
             return resources
+        except CircuitOpenError:
+            raise
         except Exception as e:
+            if self._is_denied(e):
+                raise
             print(f"Error auditing Lightsail in {self.region}: {str(e)}")
             return []
 
+    def _lightsail_tags(self, resource: Dict[str, Any]) -> Dict[str, str]:
+        return {tag['key']: tag.get('value', '') for tag in resource.get('tags', [])}
+
     def _get_instances(self) -> List[Dict[str, Any]]:
         instances = []
         try:
@@ -44,9 +52,14 @@ class LightsailService(AWSService):
                         'Bundle ID': instance['bundleId'],
                         'Public IP': instance.get('publicIpAddress', 'N/A'),
                         'Private IP': instance.get('privateIpAddress', 'N/A'),
-                        'Availability Zone': instance['location']['availabilityZone']
+                        'Availability Zone': instance['location']['availabilityZone'],
+                        **self._tag_columns(self._lightsail_tags(instance))
                     })
+        except CircuitOpenError:
+            raise
         except Exception as e:
+            if self._is_denied(e):
+                raise
             print(f"Error getting Lightsail instances: {str(e)}")
         return instances
 
@@ -66,9 +79,14 @@ class LightsailService(AWSService):
                         'Engine': f"{db['engine']} {db['engineVersion']}",
                         'Master Username': db['masterUsername'],
                         'Public': db['publiclyAccessible'],
-                        'Availability Zone': db['location']['availabilityZone']
+                        'Availability Zone': db['location']['availabilityZone'],
+                        **self._tag_columns(self._lightsail_tags(db))
                     })
+        except CircuitOpenError:
+            raise
         except Exception as e:
+            if self._is_denied(e):
+                raise
             print(f"Error getting Lightsail databases: {str(e)}")
         return databases
 
@@ -88,8 +106,13 @@ class LightsailService(AWSService):
                         'Power': container['power'],
                         'Scale': container['scale'],
                         'Principal ARN': container['principalArn'],
-                        'Availability Zone': container['location']['availabilityZone']
+                        'Availability Zone': container['location']['availabilityZone'],
+                        **self._tag_columns(self._lightsail_tags(container))
                     })
+        except CircuitOpenError:
+            raise
         except Exception as e:
+            if self._is_denied(e):
+                raise
             print(f"Error getting Lightsail containers: {str(e)}")
         return containers
\ No newline at end of file
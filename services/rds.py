@@ -1,5 +1,7 @@
 from typing import Dict, List, Any
+from utils.exceptions import CircuitOpenError
 from .base import AWSService
+from .records import RDSInstance
 
 class RDSService(AWSService):
     @property
@@ -11,21 +13,27 @@ class RDSService(AWSService):
         
         try:
             for db in self.client.describe_db_instances()['DBInstances']:
-                resources.append({
+                tags = {tag['Key']: tag['Value'] for tag in db.get('TagList', [])}
+                resources.append(RDSInstance({
                     'Region': self.region,
                     'DB Identifier': db['DBInstanceIdentifier'],
                     'Status': db['DBInstanceStatus'],
                     'Engine': f"{db['Engine']} {db['EngineVersion']}",
                     'Instance Class': db['DBInstanceClass'],
-                    'Storage': f"{db['AllocatedStorage']} GB",
+                    'Storage': db['AllocatedStorage'] * 1024**3,
                     'Storage Type': db['StorageType'],
                     'Multi-AZ': db.get('MultiAZ', False),
-                    'Endpoint': db.get('Endpoint', {}).get('Address', 'N/A'),
-                    'Port': db.get('Endpoint', {}).get('Port', 'N/A'),
-                    'VPC ID': db.get('DBSubnetGroup', {}).get('VpcId', 'N/A'),
-                    'Publicly Accessible': db.get('PubliclyAccessible', False)
-                })
+                    'Endpoint': db.get('Endpoint', {}).get('Address'),
+                    'Port': db.get('Endpoint', {}).get('Port'),
+                    'VPC ID': db.get('DBSubnetGroup', {}).get('VpcId'),
+                    'Publicly Accessible': db.get('PubliclyAccessible', False),
+                    **self._tag_columns(tags)
+                }))
+        except CircuitOpenError:
+            raise
         except Exception as e:
+            if self._is_denied(e):
+                raise
             print(f"Error auditing RDS in {self.region}: {str(e)}")
             
         return resources
\ No newline at end of file
@@ -0,0 +1,258 @@
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+from collections.abc import Mapping
+from datetime import datetime
+
+# Shown in reports for values the API did not return
+MISSING = 'N/A'
+
+class Column:
+    """One field of a record schema: the raw value kind and how reports display it"""
+    __slots__ = ('name', 'kind', 'display', 'missing')
+
+    def __init__(self, name: str, kind: str = 'str', display: Callable[[Any], Any] = None,
+                 missing: Any = MISSING):
+        self.name = name
+        self.kind = kind
+        self.display = display
+        self.missing = missing
+
+    def format(self, value: Any) -> Any:
+        if value is None:
+            return self.missing
+        if self.display is not None:
+            return self.display(value)
+        if self.kind == 'timestamp':
+            return str(value)
+        return value
+
+class Record(Mapping):
+    """Compact resource record: schema columns live in slots, anything else (tag columns) in `_extra`
+
+    Item access returns the raw values (datetimes, byte counts); `to_dict` and `display_items`
+    apply each column's display format, which is what the JSON and Excel reports show.
+    """
+    __slots__ = ('_extra',)
+    COLUMNS: Tuple[Column, ...] = ()
+    _SLOTS: Dict[str, str] = {}
+
+    def __init__(self, fields: Dict[str, Any]):
+        extra = None
+        for column, value in fields.items():
+            slot = self._SLOTS.get(column)
+            if slot is None:
+                if extra is None:
+                    extra = {}
+                extra[column] = value
+            else:
+                setattr(self, slot, value)
+        for column, slot in self._SLOTS.items():
+            if column not in fields:
+                setattr(self, slot, None)
+        self._extra = extra
+
+    def __getitem__(self, key: str) -> Any:
+        slot = self._SLOTS.get(key)
+        if slot is not None:
+            return getattr(self, slot)
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any):
+        slot = self._SLOTS.get(key)
+        if slot is not None:
+            setattr(self, slot, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._SLOTS
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        return len(self._SLOTS) + (len(self._extra) if self._extra is not None else 0)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({dict(self.items())!r})"
+
+    def display_items(self) -> Iterator[Tuple[str, Any]]:
+        for column in self.COLUMNS:
+            yield column.name, column.format(getattr(self, self._SLOTS[column.name]))
+        if self._extra is not None:
+            yield from self._extra.items()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.display_items())
+
+    def to_raw(self) -> Dict[str, Any]:
+        """Raw values in JSON-safe form, timestamps as ISO 8601; `from_raw` reverses it"""
+        raw = dict(self.items())
+        for column in self.COLUMNS:
+            value = raw[column.name]
+            if column.kind == 'timestamp' and isinstance(value, datetime):
+                raw[column.name] = value.isoformat()
+        return raw
+
+    @classmethod
+    def from_raw(cls, raw: Dict[str, Any]) -> 'Record':
+        fields = dict(raw)
+        for column in cls.COLUMNS:
+            value = fields.get(column.name)
+            if column.kind == 'timestamp' and isinstance(value, str):
+                fields[column.name] = datetime.fromisoformat(value)
+        return cls(fields)
+
+# Record types by name, so stored records can be rebuilt with their schema
+RECORD_TYPES: Dict[str, type] = {}
+
+def record_type(name: str, columns: List[Column]) -> type:
+    """Build a Record subclass with one slot per schema column"""
+    slots = tuple(f'_f{idx}' for idx in range(len(columns)))
+    cls = type(name, (Record,), {
+        '__module__': __name__,
+        '__slots__': slots,
+        'COLUMNS': tuple(columns),
+        '_SLOTS': {column.name: slot for column, slot in zip(columns, slots)}
+    })
+    RECORD_TYPES[name] = cls
+    return cls
+
+def json_default(value: Any) -> Any:
+    """json.dump hook: records are written in their display form, anything else as a string"""
+    if isinstance(value, Record):
+        return value.to_dict()
+    return str(value)
+
+def raw_json_default(value: Any) -> Any:
+    """json.dump hook for data that is read back: records keep their type and raw values"""
+    if isinstance(value, Record):
+        return {'__record__': type(value).__name__, 'fields': value.to_raw()}
+    return str(value)
+
+def raw_json_hook(obj: Dict[str, Any]) -> Any:
+    """json.load object hook that rebuilds the records written with raw_json_default"""
+    record_name = obj.get('__record__')
+    if record_name in RECORD_TYPES and len(obj) == 2:
+        return RECORD_TYPES[record_name].from_raw(obj['fields'])
+    return obj
+
+def display_items(row: Dict[str, Any]) -> Iterator[Tuple[str, Any]]:
+    """Items of a row as reports show them, for both records and plain dicts"""
+    if isinstance(row, Record):
+        return row.display_items()
+    return iter(row.items())
+
+def _megabytes(value: int) -> str:
+    return f"{value / (1024*1024):.2f} MB"
+
+def _whole_megabytes(value: int) -> str:
+    return f"{value // (1024*1024)} MB"
+
+def _whole_gigabytes(value: int) -> str:
+    return f"{value // (1024**3)} GB"
+
+def _human_size(value: int) -> str:
+    for unit, factor in (('TB', 1024**4), ('GB', 1024**3), ('MB', 1024**2)):
+        if value >= factor:
+            return f"{value / factor:.2f} {unit}"
+    return f"{value / 1024:.2f} KB"
+
+def _thousands(value: int) -> str:
+    return f"{value:,}"
+
+EC2Instance = record_type('EC2Instance', [
+    Column('Region'),
+    Column('Instance ID'),
+    Column('Name'),
+    Column('State'),
+    Column('Instance Type'),
+    Column('Platform'),
+    Column('Private IP'),
+    Column('Public IP'),
+    Column('Elastic IP'),
+    Column('EIP Allocation ID'),
+    Column('VPC ID'),
+    Column('Subnet ID'),
+    Column('Key Name'),
+    Column('Launch Time', 'timestamp'),
+    Column('Security Groups')
+])
+
+RDSInstance = record_type('RDSInstance', [
+    Column('Region'),
+    Column('DB Identifier'),
+    Column('Status'),
+    Column('Engine'),
+    Column('Instance Class'),
+    Column('Storage', 'bytes', _whole_gigabytes),
+    Column('Storage Type'),
+    Column('Multi-AZ', 'bool'),
+    Column('Endpoint'),
+    Column('Port', 'int'),
+    Column('VPC ID'),
+    Column('Publicly Accessible', 'bool')
+])
+
+LambdaFunction = record_type('LambdaFunction', [
+    Column('Region'),
+    Column('Function Name'),
+    Column('ARN'),
+    Column('Runtime'),
+    Column('Handler'),
+    Column('Code Size', 'bytes', _megabytes),
+    Column('Memory', 'bytes', _whole_megabytes),
+    Column('Timeout', 'int', lambda value: f"{value} seconds"),
+    Column('Last Modified', 'timestamp'),
+    Column('Environment Variables', 'int'),
+    Column('Layers', 'int'),
+    Column('VPC Config', 'bool'),
+    Column('VPC ID'),
+    Column('Reserved Concurrency', 'any'),
+    Column('Architecture'),
+    Column('Package Type'),
+    Column('Resource Policy', 'any'),
+    Column('Tags')
+])
+
+DynamoDBTable = record_type('DynamoDBTable', [
+    Column('Region'),
+    Column('Table Name'),
+    Column('ARN'),
+    Column('Status'),
+    Column('Creation Time', 'timestamp'),
+    Column('Item Count', 'int'),
+    Column('Size (Bytes)', 'int'),
+    Column('Billing Mode'),
+    Column('Read Capacity', 'int'),
+    Column('Write Capacity', 'int'),
+    Column('Point-in-Time Recovery'),
+    Column('Stream Enabled', 'bool'),
+    Column('Encryption Type'),
+    Column('Global Table', 'bool'),
+    Column('GSI Count', 'int'),
+    Column('GSI Size (Bytes)', 'int'),
+    Column('LSI Count', 'int'),
+    Column('LSI Size (Bytes)', 'int'),
+    Column('Replicas'),
+    Column('Tags')
+])
+
+S3Bucket = record_type('S3Bucket', [
+    Column('Versioning'),
+    Column('EncryptionEnabled', 'any'),
+    Column('EncryptionType'),
+    Column('PublicAccessBlock'),
+    Column('LifecycleRules', 'any'),
+    Column('LoggingEnabled', 'any'),
+    Column('LoggingTarget'),
+    Column('ReplicationRules', 'any'),
+    Column('BucketName'),
+    Column('CreationDate', 'timestamp'),
+    Column('Region'),
+    Column('Size', 'bytes', _human_size),
+    Column('ObjectCount', 'int', _thousands),
+    Column('MetricsSource')
+])
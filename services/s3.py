@@ -1,90 +1,136 @@
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Iterator
+from concurrent.futures import ThreadPoolExecutor
+import boto3
+from botocore.exceptions import ClientError
+from utils.exceptions import CircuitOpenError
 from .base import AWSService
+from .records import S3Bucket
+from .s3_metrics import METRICS_STRATEGIES, ExactCountStrategy
+from config.settings import S3_BUCKET_WORKERS, S3_EXACT_COUNT_MAX_OBJECTS
 
 class S3Service(AWSService):
+    def __init__(self, session: boto3.Session, region: str = None,
+                 metrics_strategy: str = 'cloudwatch', exact_count_cap: int = S3_EXACT_COUNT_MAX_OBJECTS,
+                 bucket_workers: int = S3_BUCKET_WORKERS, **kwargs):
+        super().__init__(session, region, **kwargs)
+        self.bucket_workers = bucket_workers
+        if metrics_strategy == ExactCountStrategy.name:
+            self.metrics_strategy = ExactCountStrategy(self.client_pool, max_objects=exact_count_cap)
+        else:
+            self.metrics_strategy = METRICS_STRATEGIES[metrics_strategy](self.client_pool)
+
     @property
     def service_name(self) -> str:
         return 's3'
-    
-    def get_bucket_metrics(self, bucket_name: str) -> Dict[str, str]:
-        results = {
-            'BucketSizeBytes': 'N/A',
-            'NumberOfObjects': 'N/A'
-        }
-        
+
+    def audit(self) -> List[Dict[str, Any]]:
+        # Buckets are fanned out as the listing pages arrive; map keeps listing order
+        with ThreadPoolExecutor(max_workers=self.bucket_workers) as executor:
+            bucket_details = list(executor.map(self._get_bucket_details, self._list_buckets()))
+        resources = [bucket_info for bucket_info in bucket_details if bucket_info]
+
+        metrics = self.metrics_strategy.collect({r['BucketName']: r['Region'] for r in resources})
+        return [S3Bucket({**bucket_info, **self._metrics_fields(metrics[bucket_info['BucketName']])})
+                for bucket_info in resources]
+
+    def _list_buckets(self) -> Iterator[Dict[str, Any]]:
+        if not self.client.can_paginate('list_buckets'):
+            yield from self.client.list_buckets()['Buckets']
+            return
+        paginator = self.client.get_paginator('list_buckets')
+        for page in paginator.paginate(PaginationConfig={'PageSize': 1000}):
+            yield from page['Buckets']
+
+    def _get_bucket_details(self, bucket: Dict[str, Any]) -> Dict[str, Any]:
         try:
-            total_size = 0
-            total_objects = 0
-            paginator = self.client.get_paginator('list_objects_v2')
-            
-            for page in paginator.paginate(Bucket=bucket_name):
-                if 'Contents' in page:
-                    for obj in page['Contents']:
-                        total_size += obj.get('Size', 0)
-                        total_objects += 1
-            
-            if total_size > 0:
-                size_str = self._format_size(total_size)
-                results['BucketSizeBytes'] = size_str
-                results['NumberOfObjects'] = f"{total_objects:,}"
-                    
+            region = bucket.get('BucketRegion') or self._get_bucket_region(bucket)
+
+            # Talk to the bucket's own region to avoid a redirect on every call
+            client = self.client_pool.get_client('s3', region, max_pool_connections=self.bucket_workers)
+            bucket_info = self._get_bucket_info(client, bucket['Name'])
+            bucket_info.update({
+                'BucketName': bucket['Name'],
+                'CreationDate': bucket['CreationDate'],
+                'Region': region
+            })
+            return bucket_info
+
+        except CircuitOpenError:
+            raise
         except Exception as e:
-            print(f"Error getting metrics for bucket {bucket_name}: {str(e)}")
-        
-        return results
-
-    def _format_size(self, size: int) -> str:
-        for unit in ['TB', 'GB', 'MB', 'KB']:
-            if size >= 1024**4 and unit == 'TB':
-                return f"{size / (1024**4):.2f} TB"
-            elif size >= 1024**3 and unit == 'GB':
-                return f"{size / (1024**3):.2f} GB"
-            elif size >= 1024**2 and unit == 'MB':
-                return f"{size / (1024**2):.2f} MB"
-        return f"{size / 1024:.2f} KB"
+            print(f"Error processing bucket {bucket['Name']}: {str(e)}")
+            return None
 
-    def audit(self) -> List[Dict[str, Any]]:
-        resources = []
-        buckets = self.client.list_buckets()['Buckets']
-        
-        for bucket in buckets:
-            try:
-                location = self.client.get_bucket_location(Bucket=bucket['Name'])
-                region = location['LocationConstraint'] or 'us-east-1'
-                
-                bucket_info = self._get_bucket_info(bucket['Name'])
-                metrics = self.get_bucket_metrics(bucket['Name'])
-                
-                bucket_info.update({
-                    'BucketName': bucket['Name'],
-                    'CreationDate': str(bucket['CreationDate']),
-                    'Region': region,
-                    'Size': metrics['BucketSizeBytes'],
-                    'ObjectCount': metrics['NumberOfObjects']
-                })
-                
-                resources.append(bucket_info)
-                
-            except Exception as e:
-                print(f"Error processing bucket {bucket['Name']}: {str(e)}")
-                
-        return resources
-
-    def _get_bucket_info(self, bucket_name: str) -> Dict[str, Any]:
+    def _get_bucket_region(self, bucket: Dict[str, Any]) -> str:
+        # A bucket cannot move, so in incremental mode its region is reused until it is recreated.
+        # Its configuration (encryption, public access, ...) can change at any time and is always read.
+        bucket_arn = f"arn:aws:s3:::{bucket['Name']}"
+        marker = [str(bucket['CreationDate'])]
+        snapshot = self._load_snapshot(bucket_arn, marker)
+        if snapshot is not None:
+            return snapshot['Region']
+        location = self.client.get_bucket_location(Bucket=bucket['Name'])
+        region = location['LocationConstraint'] or 'us-east-1'
+        self._save_snapshot(bucket_arn, marker, {'Region': region})
+        return region
+
+    def _metrics_fields(self, metrics: Dict[str, Any]) -> Dict[str, Any]:
+        # Raw byte and object counts; the record formats them for the reports
+        return {
+            'Size': metrics['SizeBytes'],
+            'ObjectCount': metrics['ObjectCount'],
+            'MetricsSource': metrics['Source']
+        }
+
+    def _get_bucket_info(self, client, bucket_name: str) -> Dict[str, Any]:
         info = {}
         
         try:
-            versioning = self.client.get_bucket_versioning(Bucket=bucket_name)
+            versioning = client.get_bucket_versioning(Bucket=bucket_name)
             info['Versioning'] = versioning.get('Status', 'Disabled')
+        except CircuitOpenError:
+            raise
         except:
             info['Versioning'] = 'Unknown'
         
         try:
-            encryption = self.client.get_bucket_encryption(Bucket=bucket_name)
+            encryption = client.get_bucket_encryption(Bucket=bucket_name)
             info['EncryptionEnabled'] = True
             info['EncryptionType'] = encryption['ServerSideEncryptionConfiguration']['Rules'][0]['ApplyServerSideEncryptionByDefault']['SSEAlgorithm']
+        except CircuitOpenError:
+            raise
         except:
             info['EncryptionEnabled'] = False
             info['EncryptionType'] = 'None'
+
+        try:
+            block = client.get_public_access_block(Bucket=bucket_name)['PublicAccessBlockConfiguration']
+            enabled = [setting for setting, value in block.items() if value]
+            info['PublicAccessBlock'] = 'Enabled' if len(enabled) == len(block) else ('Partial' if enabled else 'Disabled')
+        except ClientError as e:
+            info['PublicAccessBlock'] = 'Not Configured' if self._error_code(e) == 'NoSuchPublicAccessBlockConfiguration' else 'Unknown'
+
+        try:
+            lifecycle = client.get_bucket_lifecycle_configuration(Bucket=bucket_name)
+            info['LifecycleRules'] = len(lifecycle.get('Rules', []))
+        except ClientError as e:
+            info['LifecycleRules'] = 0 if self._error_code(e) == 'NoSuchLifecycleConfiguration' else 'Unknown'
+
+        try:
+            logging = client.get_bucket_logging(Bucket=bucket_name).get('LoggingEnabled')
+            info['LoggingEnabled'] = bool(logging)
+            info['LoggingTarget'] = logging['TargetBucket'] if logging else 'N/A'
+        except ClientError:
+            info['LoggingEnabled'] = 'Unknown'
+            info['LoggingTarget'] = 'N/A'
+
+        try:
+            replication = client.get_bucket_replication(Bucket=bucket_name)['ReplicationConfiguration']
+            info['ReplicationRules'] = len(replication.get('Rules', []))
+        except ClientError as e:
+            info['ReplicationRules'] = 0 if self._error_code(e) == 'ReplicationConfigurationNotFoundError' else 'Unknown'
             
-        return info
\ No newline at end of file
+        return info
+
+    def _error_code(self, e: ClientError) -> str:
+        return e.response.get('Error', {}).get('Code', '')
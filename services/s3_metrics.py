@@ -0,0 +1,158 @@
+from typing import Dict, List, Any, Tuple
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event, Lock
+from utils.client_pool import ClientPool
+from config.settings import S3_EXACT_COUNT_WORKERS, S3_EXACT_COUNT_MAX_OBJECTS
+
+# GetMetricData accepts at most 500 queries per request
+MAX_METRIC_QUERIES = 500
+
+def empty_metrics(source: str) -> Dict[str, Any]:
+    return {'SizeBytes': None, 'ObjectCount': None, 'Source': source}
+
+class CloudWatchMetricsStrategy:
+    """Reads the daily S3 storage metrics from CloudWatch in each bucket's region"""
+    name = 'cloudwatch'
+
+    def __init__(self, client_pool: ClientPool):
+        self.client_pool = client_pool
+
+    def collect(self, bucket_regions: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+        results = {bucket: empty_metrics(self.name) for bucket in bucket_regions}
+        by_region = {}
+        for bucket, region in bucket_regions.items():
+            by_region.setdefault(region, []).append(bucket)
+
+        for region, buckets in by_region.items():
+            try:
+                self._collect_region(region, buckets, results)
+            except Exception as e:
+                print(f"Error getting S3 storage metrics in {region}: {str(e)}")
+        return results
+
+    def _collect_region(self, region: str, buckets: List[str], results: Dict[str, Dict[str, Any]]):
+        cloudwatch = self.client_pool.get_client('cloudwatch', region)
+        wanted = set(buckets)
+        queries = {}
+
+        # BucketSizeBytes is published once per storage class, so find which exist
+        paginator = cloudwatch.get_paginator('list_metrics')
+        for page in paginator.paginate(Namespace='AWS/S3', MetricName='BucketSizeBytes'):
+            for metric in page['Metrics']:
+                dimensions = {d['Name']: d['Value'] for d in metric['Dimensions']}
+                if dimensions.get('BucketName') in wanted:
+                    queries[f"q{len(queries)}"] = ('SizeBytes', dimensions['BucketName'], metric['Dimensions'])
+
+        for bucket in buckets:
+            queries[f"q{len(queries)}"] = ('ObjectCount', bucket, [
+                {'Name': 'BucketName', 'Value': bucket},
+                {'Name': 'StorageType', 'Value': 'AllStorageTypes'}
+            ])
+
+        end_time = datetime.now(timezone.utc)
+        start_time = end_time - timedelta(days=3)
+        query_ids = list(queries)
+        for start in range(0, len(query_ids), MAX_METRIC_QUERIES):
+            batch = [self._metric_query(query_id, queries[query_id])
+                     for query_id in query_ids[start:start + MAX_METRIC_QUERIES]]
+            paginator = cloudwatch.get_paginator('get_metric_data')
+            for page in paginator.paginate(MetricDataQueries=batch, StartTime=start_time,
+                                           EndTime=end_time, ScanBy='TimestampDescending'):
+                for data in page['MetricDataResults']:
+                    if not data.get('Values'):
+                        continue
+                    field, bucket, _ = queries[data['Id']]
+                    current = results[bucket][field] or 0
+                    results[bucket][field] = current + int(data['Values'][0])
+
+    def _metric_query(self, query_id: str, query: Tuple[str, str, List[Dict[str, str]]]) -> Dict[str, Any]:
+        field, _, dimensions = query
+        return {
+            'Id': query_id,
+            'MetricStat': {
+                'Metric': {
+                    'Namespace': 'AWS/S3',
+                    'MetricName': 'BucketSizeBytes' if field == 'SizeBytes' else 'NumberOfObjects',
+                    'Dimensions': dimensions
+                },
+                'Period': 86400,
+                'Stat': 'Average'
+            },
+            'ReturnData': True
+        }
+
+class ExactCountStrategy:
+    """Counts objects exactly by listing top-level prefixes in parallel, up to a cap per bucket"""
+    name = 'exact'
+
+    def __init__(self, client_pool: ClientPool, max_workers: int = S3_EXACT_COUNT_WORKERS,
+                 max_objects: int = S3_EXACT_COUNT_MAX_OBJECTS):
+        self.client_pool = client_pool
+        self.max_workers = max_workers
+        self.max_objects = max_objects
+
+    def collect(self, bucket_regions: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+        results = {}
+        for bucket, region in bucket_regions.items():
+            try:
+                results[bucket] = self._count_bucket(bucket, region)
+            except Exception as e:
+                print(f"Error getting metrics for bucket {bucket}: {str(e)}")
+                results[bucket] = empty_metrics(self.name)
+        return results
+
+    def _count_bucket(self, bucket: str, region: str) -> Dict[str, Any]:
+        client = self.client_pool.get_client('s3', region)
+        totals = {'SizeBytes': 0, 'ObjectCount': 0}
+        lock = Lock()
+        capped = Event()
+
+        def add(objects: List[Dict[str, Any]]):
+            with lock:
+                totals['SizeBytes'] += sum(obj.get('Size', 0) for obj in objects)
+                totals['ObjectCount'] += len(objects)
+                if self.max_objects and totals['ObjectCount'] >= self.max_objects:
+                    capped.set()
+
+        def scan(prefix: str):
+            paginator = client.get_paginator('list_objects_v2')
+            for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+                if capped.is_set():
+                    return
+                add(page.get('Contents', []))
+
+        # Partition the key space on the first delimiter and list each prefix separately
+        prefixes = []
+        paginator = client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=bucket, Delimiter='/'):
+            if capped.is_set():
+                break
+            add(page.get('Contents', []))
+            prefixes.extend(p['Prefix'] for p in page.get('CommonPrefixes', []))
+
+        if prefixes and not capped.is_set():
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                list(executor.map(scan, prefixes))
+
+        return {
+            'SizeBytes': totals['SizeBytes'],
+            'ObjectCount': totals['ObjectCount'],
+            'Source': f"{self.name} (capped)" if capped.is_set() else self.name
+        }
+
+class NoMetricsStrategy:
+    """Skips bucket size and object count collection"""
+    name = 'none'
+
+    def __init__(self, client_pool: ClientPool):
+        self.client_pool = client_pool
+
+    def collect(self, bucket_regions: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+        return {bucket: empty_metrics('skipped') for bucket in bucket_regions}
+
+METRICS_STRATEGIES = {
+    CloudWatchMetricsStrategy.name: CloudWatchMetricsStrategy,
+    ExactCountStrategy.name: ExactCountStrategy,
+    NoMetricsStrategy.name: NoMetricsStrategy
+}
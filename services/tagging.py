@@ -0,0 +1,38 @@
+from typing import Dict, Optional
+from threading import Lock
+from utils.client_pool import ClientPool
+
+class TagIndex:
+    """Tags for every resource in a region, keyed by ARN and built once from the Resource Groups Tagging API"""
+
+    def __init__(self, client_pool: ClientPool, region: str):
+        self.client_pool = client_pool
+        self.region = region
+        self.available = True
+        self._tags = None
+        self._lock = Lock()
+
+    def get(self, arn: str) -> Optional[Dict[str, str]]:
+        """Return the tags for an ARN, or None when the index could not be built"""
+        self._build()
+        if not self.available:
+            return None
+        return self._tags.get(arn, {})
+
+    def _build(self):
+        if self._tags is not None or not self.available:
+            return
+        with self._lock:
+            if self._tags is not None or not self.available:
+                return
+            try:
+                client = self.client_pool.get_client('resourcegroupstaggingapi', self.region)
+                tags = {}
+                paginator = client.get_paginator('get_resources')
+                for page in paginator.paginate(ResourcesPerPage=100):
+                    for mapping in page['ResourceTagMappingList']:
+                        tags[mapping['ResourceARN']] = {tag['Key']: tag['Value'] for tag in mapping.get('Tags', [])}
+                self._tags = tags
+            except Exception as e:
+                print(f"Tag index unavailable in {self.region}, using per-resource tag calls: {str(e)}")
+                self.available = False
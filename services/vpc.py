@@ -1,4 +1,5 @@
-from typing import Dict, List, Any
+from typing import Callable, Dict, List, Any
+from utils.exceptions import CircuitOpenError
 from .base import AWSService
 
 class VPCService(AWSService):
@@ -7,27 +8,100 @@ class VPCService(AWSService):
         return 'ec2'  # VPC uses EC2 client
 
     def audit(self) -> List[Dict[str, Any]]:
+        # Every resource type is fetched once for the whole region and bucketed by VpcId
+        vpcs = self._describe('describe_vpcs', 'Vpcs')
+        security_groups = self._describe('describe_security_groups', 'SecurityGroups')
+        group_vpcs = {sg['GroupId']: sg.get('VpcId') for sg in security_groups}
+
+        indexes = {
+            'subnets': self._index_by_vpc(
+                self._describe('describe_subnets', 'Subnets'),
+                lambda subnet: [subnet.get('VpcId')],
+                self._format_subnet),
+            'internet_gateways': self._index_by_vpc(
+                self._describe_optional('describe_internet_gateways', 'InternetGateways'),
+                lambda igw: [a['VpcId'] for a in igw.get('Attachments', [])],
+                self._format_internet_gateway),
+            'nat_gateways': self._index_by_vpc(
+                self._describe_optional('describe_nat_gateways', 'NatGateways'),
+                lambda nat: [nat.get('VpcId')],
+                self._format_nat_gateway),
+            'route_tables': self._index_by_vpc(
+                self._describe('describe_route_tables', 'RouteTables'),
+                lambda rt: [rt.get('VpcId')],
+                self._format_route_table),
+            'security_groups': self._index_by_vpc(
+                security_groups,
+                lambda sg: [sg.get('VpcId')],
+                self._format_security_group),
+            'security_group_rules': self._index_by_vpc(
+                self._describe_optional('describe_security_group_rules', 'SecurityGroupRules'),
+                lambda rule: [group_vpcs.get(rule['GroupId'])],
+                self._format_security_group_rule),
+            'vpc_endpoints': self._index_by_vpc(
+                self._describe_optional('describe_vpc_endpoints', 'VpcEndpoints'),
+                lambda endpoint: [endpoint.get('VpcId')]),
+            'peering_connections': self._index_by_vpc(
+                self._describe_optional('describe_vpc_peering_connections', 'VpcPeeringConnections'),
+                lambda peering: [peering.get('RequesterVpcInfo', {}).get('VpcId')]),
+            'transit_gateway_attachments': self._index_by_vpc(
+                self._describe_optional('describe_transit_gateway_attachments', 'TransitGatewayAttachments',
+                                        Filters=[{'Name': 'resource-type', 'Values': ['vpc']}]),
+                lambda attachment: [attachment.get('ResourceId')]),
+            'flow_logs': self._index_by_vpc(
+                self._describe_optional('describe_flow_logs', 'FlowLogs'),
+                lambda flow_log: [flow_log.get('ResourceId')])
+        }
+
         vpc_resources = []
-        paginator = self.client.get_paginator('describe_vpcs')
-        
-        for page in paginator.paginate():
-            for vpc in page['Vpcs']:
-                vpc_details = self._get_vpc_details(vpc)
-                if vpc_details:
-                    vpc_resources.append(vpc_details)
+        for vpc in vpcs:
+            vpc_details = self._get_vpc_details(vpc, indexes)
+            if vpc_details:
+                vpc_resources.append(vpc_details)
         
         return vpc_resources
 
-    def _get_vpc_details(self, vpc: Dict) -> Dict[str, Any]:
+    def _describe(self, operation: str, key: str, **kwargs) -> List[Dict[str, Any]]:
+        items = []
+        paginator = self.client.get_paginator(operation)
+        for page in paginator.paginate(**kwargs):
+            items.extend(page.get(key, []))
+        return items
+
+    def _describe_optional(self, operation: str, key: str, **kwargs) -> List[Dict[str, Any]]:
+        try:
+            return self._describe(operation, key, **kwargs)
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            print(f"Error calling {operation} in {self.region}: {str(e)}")
+            return []
+
+    def _index_by_vpc(self, items: List[Dict], get_vpc_ids: Callable[[Dict], List[str]],
+                      formatter: Callable = None) -> Dict[str, List[Dict[str, Any]]]:
+        index = {}
+        for item in items:
+            for vpc_id in get_vpc_ids(item):
+                if not vpc_id:
+                    continue
+                index.setdefault(vpc_id, []).append(formatter(item, vpc_id) if formatter else item)
+        return index
+
+    def _get_vpc_details(self, vpc: Dict, indexes: Dict[str, Dict[str, List]]) -> Dict[str, Any]:
         vpc_id = vpc['VpcId']
         try:
-            base_details = self._get_base_vpc_info(vpc)
+            base_details = self._get_base_vpc_info(vpc, indexes['flow_logs'].get(vpc_id, []))
+            attachments = indexes['transit_gateway_attachments'].get(vpc_id, [])
             additional_details = {
-                'route_tables': self._get_route_tables(vpc_id),
-                'security_groups': self._get_security_groups(vpc_id),
-                'vpc_endpoints': self._get_vpc_endpoints(vpc_id),
-                'peering_connections': self._get_vpc_peering(vpc_id),
-                'transit_gateway': self._get_transit_gateway_details(vpc_id)
+                'subnets': indexes['subnets'].get(vpc_id, []),
+                'internet_gateways': indexes['internet_gateways'].get(vpc_id, []),
+                'nat_gateways': indexes['nat_gateways'].get(vpc_id, []),
+                'route_tables': indexes['route_tables'].get(vpc_id, []),
+                'security_groups': indexes['security_groups'].get(vpc_id, []),
+                'security_group_rules': indexes['security_group_rules'].get(vpc_id, []),
+                'vpc_endpoints': indexes['vpc_endpoints'].get(vpc_id, []),
+                'peering_connections': indexes['peering_connections'].get(vpc_id, []),
+                'transit_gateway': self._get_transit_gateway_details(attachments)
             }
             
             base_details.update(additional_details)
@@ -35,15 +109,14 @@ class VPCService(AWSService):
             
             return base_details
             
+        except CircuitOpenError:
+            raise
         except Exception as e:
             print(f"Error processing VPC {vpc_id}: {str(e)}")
             return None
 
-    def _get_base_vpc_info(self, vpc: Dict) -> Dict[str, Any]:
+    def _get_base_vpc_info(self, vpc: Dict, flow_logs: List[Dict]) -> Dict[str, Any]:
         tags = {tag['Key']: tag['Value'] for tag in vpc.get('Tags', [])}
-        flow_logs = self.client.describe_flow_logs(
-            Filters=[{'Name': 'resource-id', 'Values': [vpc['VpcId']]}]
-        )['FlowLogs']
         
         return {
             'Region': self.region,
@@ -54,42 +127,63 @@ class VPCService(AWSService):
             'Is Default': vpc.get('IsDefault', False),
             'DNS Hostnames Enabled': vpc.get('EnableDnsHostnames', False),
             'DNS Support Enabled': vpc.get('EnableDnsSupport', True),
-            'Flow Logs Enabled': len(flow_logs) > 0
+            'Flow Logs Enabled': len(flow_logs) > 0,
+            **self._tag_columns(tags)
         }
 
-    def _get_route_tables(self, vpc_id: str) -> List[Dict[str, Any]]:
-        route_tables = []
-        paginator = self.client.get_paginator('describe_route_tables')
-        
-        for page in paginator.paginate(Filters=[{'Name': 'vpc-id', 'Values': [vpc_id]}]):
-            for rt in page['RouteTables']:
-                route_tables.append(self._format_route_table(rt))
-                
-        return route_tables
-
-    def _get_security_groups(self, vpc_id: str) -> List[Dict[str, Any]]:
-        security_groups = []
-        paginator = self.client.get_paginator('describe_security_groups')
-        
-        for page in paginator.paginate(Filters=[{'Name': 'vpc-id', 'Values': [vpc_id]}]):
-            for sg in page['SecurityGroups']:
-                security_groups.append(self._format_security_group(sg))
-                
-        return security_groups
+    def _get_name(self, resource: Dict) -> str:
+        return next((tag['Value'] for tag in resource.get('Tags', [])
+                    if tag['Key'] == 'Name'), 'N/A')
+
+    def _format_subnet(self, subnet: Dict, vpc_id: str) -> Dict[str, Any]:
+        return {
+            'Region': self.region,
+            'VPC ID': subnet['VpcId'],
+            'Subnet ID': subnet['SubnetId'],
+            'Name': self._get_name(subnet),
+            'CIDR Block': subnet.get('CidrBlock', 'N/A'),
+            'Availability Zone': subnet.get('AvailabilityZone', 'N/A'),
+            'Available IPs': subnet.get('AvailableIpAddressCount', 0),
+            'Default For AZ': subnet.get('DefaultForAz', False),
+            'Map Public IP': subnet.get('MapPublicIpOnLaunch', False)
+        }
 
-    def _format_route_table(self, rt: Dict) -> Dict[str, Any]:
+    def _format_internet_gateway(self, igw: Dict, vpc_id: str) -> Dict[str, Any]:
+        return {
+            'Region': self.region,
+            'VPC ID': vpc_id,
+            'Internet Gateway ID': igw['InternetGatewayId'],
+            'Name': self._get_name(igw),
+            'State': next((a.get('State', 'N/A') for a in igw.get('Attachments', [])
+                          if a['VpcId'] == vpc_id), 'N/A')
+        }
+
+    def _format_nat_gateway(self, nat: Dict, vpc_id: str) -> Dict[str, Any]:
+        addresses = nat.get('NatGatewayAddresses', [{}])
+        return {
+            'Region': self.region,
+            'VPC ID': nat['VpcId'],
+            'NAT Gateway ID': nat['NatGatewayId'],
+            'Name': self._get_name(nat),
+            'Subnet ID': nat.get('SubnetId', 'N/A'),
+            'State': nat.get('State', 'N/A'),
+            'Connectivity Type': nat.get('ConnectivityType', 'public'),
+            'Public IP': addresses[0].get('PublicIp', 'N/A') if addresses else 'N/A',
+            'Private IP': addresses[0].get('PrivateIp', 'N/A') if addresses else 'N/A'
+        }
+
+    def _format_route_table(self, rt: Dict, vpc_id: str) -> Dict[str, Any]:
         return {
             'Region': self.region,
             'VPC ID': rt.get('VpcId', 'N/A'),
             'Route Table ID': rt['RouteTableId'],
-            'Name': next((tag['Value'] for tag in rt.get('Tags', []) 
-                        if tag['Key'] == 'Name'), 'N/A'),
+            'Name': self._get_name(rt),
             'Main': any(assoc.get('Main', False) for assoc in rt.get('Associations', [])),
             'Associated Subnets': ', '.join([assoc['SubnetId'] for assoc in rt.get('Associations', []) 
                                         if 'SubnetId' in assoc])
         }
 
-    def _format_security_group(self, sg: Dict) -> Dict[str, Any]:
+    def _format_security_group(self, sg: Dict, vpc_id: str) -> Dict[str, Any]:
         return {
             'Region': self.region,
             'VPC ID': sg.get('VpcId', 'N/A'),
@@ -98,36 +192,40 @@ class VPCService(AWSService):
             'Description': sg['Description']
         }
 
-    def _get_vpc_endpoints(self, vpc_id: str) -> List[Dict[str, Any]]:
-        try:
-            endpoints = self.client.describe_vpc_endpoints(
-                Filters=[{'Name': 'vpc-id', 'Values': [vpc_id]}]
-            )['VpcEndpoints']
-            return endpoints
-        except Exception:
-            return []
-
-    def _get_vpc_peering(self, vpc_id: str) -> List[Dict[str, Any]]:
-        try:
-            peering = self.client.describe_vpc_peering_connections(
-                Filters=[{'Name': 'requester-vpc-info.vpc-id', 'Values': [vpc_id]}]
-            )['VpcPeeringConnections']
-            return peering
-        except Exception:
-            return []
+    def _format_security_group_rule(self, rule: Dict, vpc_id: str) -> Dict[str, Any]:
+        peer = (rule.get('CidrIpv4') or rule.get('CidrIpv6') or rule.get('PrefixListId')
+                or rule.get('ReferencedGroupInfo', {}).get('GroupId', 'N/A'))
+        return {
+            'Region': self.region,
+            'VPC ID': vpc_id,
+            'Security Group ID': rule['GroupId'],
+            'Rule ID': rule['SecurityGroupRuleId'],
+            'Direction': 'Egress' if rule.get('IsEgress') else 'Ingress',
+            'Protocol': 'All' if rule.get('IpProtocol') == '-1' else rule.get('IpProtocol', 'N/A'),
+            'From Port': rule.get('FromPort', 'N/A'),
+            'To Port': rule.get('ToPort', 'N/A'),
+            'Source/Destination': peer,
+            'Description': rule.get('Description', 'N/A')
+        }
 
-    def _get_transit_gateway_details(self, vpc_id: str) -> Dict[str, Any]:
+    def _get_transit_gateway_details(self, attachments: List[Dict]) -> Dict[str, Any]:
+        route_tables = {a['Association']['TransitGatewayRouteTableId'] for a in attachments
+                        if a.get('Association', {}).get('TransitGatewayRouteTableId')}
         return {
-            'attachments': [],
-            'route_tables': []
+            'attachments': attachments,
+            'route_tables': sorted(route_tables)
         }
 
     def _get_resource_counts(self, details: Dict[str, List]) -> Dict[str, int]:
         return {
+            'Subnets': len(details['subnets']),
+            'Internet Gateways': len(details['internet_gateways']),
+            'NAT Gateways': len(details['nat_gateways']),
             'Route Tables': len(details['route_tables']),
             'Security Groups': len(details['security_groups']),
+            'Security Group Rules': len(details['security_group_rules']),
             'VPC Endpoints': len(details['vpc_endpoints']),
             'Peering Connections': len(details['peering_connections']),
             'Transit Gateway Attachments': len(details['transit_gateway'].get('attachments', [])),
             'Transit Gateway Route Tables': len(details['transit_gateway'].get('route_tables', []))
-        }
\ No newline at end of file
+        }
@@ -2,16 +2,32 @@ from .exceptions import (
     AWSAuditorError,
     RegionError,
     ServiceError,
+    CircuitOpenError,
     AuthenticationError,
     ResourceAccessError,
     ReportGenerationError
 )
+from .client_pool import ClientPool
+from .rate_limit import TokenBucket, AdaptiveTokenBucket, RateLimiter, shared_rate_limiter
+from .circuit_breaker import CircuitBreaker
+from .cache import DiskCache, user_cache_dir
+from .snapshot import SnapshotStore
 
 __all__ = [
     'AWSAuditorError',
     'RegionError',
     'ServiceError',
+    'CircuitOpenError',
     'AuthenticationError',
     'ResourceAccessError',
-    'ReportGenerationError'
+    'ReportGenerationError',
+    'ClientPool',
+    'TokenBucket',
+    'AdaptiveTokenBucket',
+    'RateLimiter',
+    'shared_rate_limiter',
+    'CircuitBreaker',
+    'DiskCache',
+    'user_cache_dir',
+    'SnapshotStore'
 ]
\ No newline at end of file
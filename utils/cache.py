@@ -0,0 +1,93 @@
+from typing import Any, Optional
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from config.settings import CACHE_DIR_NAME, CACHE_MAX_ENTRIES
+
+def user_cache_dir() -> str:
+    """Return the per-user cache directory for the auditor"""
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA', os.path.expanduser('~'))
+    elif sys.platform == 'darwin':
+        base = os.path.expanduser('~/Library/Caches')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache'))
+    return os.path.join(base, CACHE_DIR_NAME)
+
+class DiskCache:
+    """JSON values cached on disk with a time-to-live, one file per key"""
+
+    def __init__(self, namespace: str, ttl: int, directory: str = None, refresh: bool = False,
+                 max_entries: int = CACHE_MAX_ENTRIES):
+        self.directory = os.path.join(directory or user_cache_dir(), namespace)
+        self.ttl = ttl
+        self.refresh = refresh
+        self.max_entries = max_entries
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None when missing, expired or refreshing"""
+        if self.refresh:
+            return None
+        try:
+            with open(self._path(key)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get('key') != key or time.time() - entry.get('stored_at', 0) > self.ttl:
+            return None
+        return entry['value']
+
+    def set(self, key: str, value: Any):
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'key': key, 'stored_at': time.time(), 'value': value}, f, default=str)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def get_or_set(self, key: str, loader) -> Any:
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            try:
+                self.set(key, value)
+            except OSError as e:
+                print(f"Unable to write cache entry {key}: {str(e)}")
+        return value
+
+    def evict(self):
+        """Remove expired entries and the oldest ones beyond max_entries"""
+        try:
+            names = [name for name in os.listdir(self.directory) if name.endswith('.json')]
+        except OSError:
+            return
+
+        entries = []
+        now = time.time()
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                modified = os.path.getmtime(path)
+                if now - modified > self.ttl:
+                    os.remove(path)
+                else:
+                    entries.append((modified, path))
+            except OSError:
+                continue
+
+        entries.sort()
+        for _, path in entries[:max(0, len(entries) - self.max_entries)]:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(key.encode('utf-8')).hexdigest() + '.json')
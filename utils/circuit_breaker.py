@@ -0,0 +1,98 @@
+from typing import Dict, Optional, Tuple
+from threading import Lock
+import time
+from botocore.exceptions import (ConnectionClosedError, ConnectTimeoutError, EndpointConnectionError,
+                                 ReadTimeoutError)
+from config.settings import (CIRCUIT_BREAKER_ERROR_CLASSES, CIRCUIT_BREAKER_RESET_SECONDS,
+                             CIRCUIT_BREAKER_THRESHOLD)
+from .exceptions import CircuitOpenError
+
+NETWORK_ERRORS = (ConnectionClosedError, ConnectTimeoutError, EndpointConnectionError, ReadTimeoutError)
+
+class CircuitBreaker:
+    """Fails calls fast once a (region, service) pair keeps failing with the same class of error
+
+    Only errors that say something about the whole region or service count: access denials
+    of region-wide calls, exhausted throttling retries, server errors and network failures.
+    A call that names one resource (it has required parameters, e.g. GetBucketVersioning or
+    Lambda GetPolicy) can be denied by that resource's policy or a missing optional permission,
+    so its access denials never trip the breaker; the collector only loses that field.
+    """
+
+    def __init__(self, threshold: int = CIRCUIT_BREAKER_THRESHOLD,
+                 reset_seconds: float = CIRCUIT_BREAKER_RESET_SECONDS):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self._failures: Dict[Tuple[str, str, str], int] = {}
+        self._opened: Dict[Tuple[str, str], Tuple[str, float]] = {}
+        self._lock = Lock()
+
+    def attach(self, client, region: str):
+        """Hook the breaker into every API call the client makes"""
+        service = client.meta.service_model.service_name
+        events = client.meta.events
+
+        def before_call(**kwargs):
+            self.check(region, service)
+
+        def after_call(parsed=None, http_response=None, model=None, **kwargs):
+            code = (parsed or {}).get('Error', {}).get('Code')
+            status = getattr(http_response, 'status_code', 200)
+            if code or status >= 400:
+                error_class = self.classify_code(code, status)
+                if error_class == 'access_denied' and targets_resource(model):
+                    return
+                self.record_failure(region, service, error_class)
+            else:
+                self.record_success(region, service)
+
+        def after_call_error(exception=None, **kwargs):
+            if isinstance(exception, NETWORK_ERRORS):
+                self.record_failure(region, service, 'network')
+
+        events.register('before-call.*.*', before_call)
+        events.register('after-call', after_call)
+        events.register('after-call-error', after_call_error)
+
+    def check(self, region: str, service: str):
+        """Raise CircuitOpenError while the pair's circuit is open"""
+        with self._lock:
+            opened = self._opened.get((region, service))
+            if opened is None:
+                return
+            error_class, opened_at = opened
+            if time.monotonic() - opened_at < self.reset_seconds:
+                raise CircuitOpenError(region, service, error_class, self.threshold)
+            # Half open: let one call through, the next failure opens the circuit again
+            del self._opened[(region, service)]
+            self._failures[(region, service, error_class)] = self.threshold - 1
+
+    def record_failure(self, region: str, service: str, error_class: Optional[str]):
+        if error_class is None:
+            return
+        with self._lock:
+            key = (region, service, error_class)
+            self._failures[key] = self._failures.get(key, 0) + 1
+            if self._failures[key] >= self.threshold and (region, service) not in self._opened:
+                self._opened[(region, service)] = (error_class, time.monotonic())
+                print(f"Circuit opened for {service} in {region} after "
+                      f"{self._failures[key]} consecutive {error_class} errors")
+
+    def record_success(self, region: str, service: str):
+        with self._lock:
+            for key in [key for key in self._failures if key[:2] == (region, service)]:
+                del self._failures[key]
+
+    def classify_code(self, code: Optional[str], status: int) -> Optional[str]:
+        """Map an error code to the class of failure it counts towards, None when it is per-resource"""
+        for error_class, codes in CIRCUIT_BREAKER_ERROR_CLASSES.items():
+            if code in codes:
+                return error_class
+        if status >= 500:
+            return 'server'
+        return None
+
+def targets_resource(model) -> bool:
+    """Whether an operation addresses named resources rather than the whole region"""
+    shape = getattr(model, 'input_shape', None)
+    return bool(shape is not None and shape.required_members)
@@ -0,0 +1,66 @@
+from typing import Any, Callable, Dict, Tuple
+from threading import Lock, local
+import boto3
+from botocore.config import Config
+from config.settings import CLIENT_CONFIG, DEFAULT_MAX_WORKERS
+from .circuit_breaker import CircuitBreaker
+from .rate_limit import RateLimiter
+
+# Region the circuit breaker uses for clients of global services
+GLOBAL_ENDPOINT = 'global'
+
+class ClientPool:
+    """Thread-safe cache of long-lived boto3 clients keyed by (service_name, region)"""
+
+    def __init__(self, session: boto3.Session, max_pool_connections: int = DEFAULT_MAX_WORKERS,
+                 session_factory: Callable[[], boto3.Session] = None,
+                 client_config: Dict[str, Any] = None, breaker: CircuitBreaker = None,
+                 rate_limiter: RateLimiter = None, scope: str = None):
+        self.session = session
+        self.session_factory = session_factory or self._new_session
+        self.config = Config(max_pool_connections=max_pool_connections,
+                             **{**CLIENT_CONFIG, **(client_config or {})})
+        self.breaker = breaker
+        self.rate_limiter = rate_limiter
+        self.scope = scope
+        self._clients: Dict[Tuple[str, str], object] = {}
+        self._lock = Lock()
+        self._local = local()
+
+    def get_client(self, service_name: str, region: str = None, max_pool_connections: int = None):
+        """Return the shared client for a service and region, creating it on first use"""
+        key = (service_name, region)
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    config = self.config
+                    if max_pool_connections and max_pool_connections > config.max_pool_connections:
+                        config = config.merge(Config(max_pool_connections=max_pool_connections))
+                    client = self._thread_session().client(
+                        service_name,
+                        region_name=region,
+                        config=config
+                    )
+                    # The breaker is attached first so an open circuit does not spend rate tokens
+                    if self.breaker:
+                        self.breaker.attach(client, region or GLOBAL_ENDPOINT)
+                    if self.rate_limiter:
+                        self.rate_limiter.attach(client, region or GLOBAL_ENDPOINT, scope=self.scope)
+                    self._clients[key] = client
+        return client
+
+    def _thread_session(self) -> boto3.Session:
+        # boto3 sessions are not thread-safe, so every thread builds clients from its own
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self.session_factory()
+            self._local.session = session
+        return session
+
+    def _new_session(self) -> boto3.Session:
+        return boto3.Session(
+            profile_name=self.session.profile_name,
+            region_name=self.session.region_name
+        )
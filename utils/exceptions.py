@@ -10,6 +10,17 @@ class ServiceError(AWSAuditorError):
     """Exception raised for service-related errors"""
     pass
 
+class CircuitOpenError(ServiceError):
+    """Exception raised when calls to a failing region and service are short-circuited"""
+
+    def __init__(self, region: str, service: str, error_class: str, failures: int):
+        self.region = region
+        self.service = service
+        self.error_class = error_class
+        self.failures = failures
+        super().__init__(f"Circuit open for {service} in {region} after {failures} "
+                         f"consecutive {error_class} errors")
+
 class AuthenticationError(AWSAuditorError):
     """Exception raised for AWS authentication errors"""
     pass
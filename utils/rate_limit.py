@@ -0,0 +1,162 @@
+from typing import Any, Dict, List, Tuple
+from threading import Lock
+import re
+import time
+from config.settings import (API_RATE_LIMITS, CIRCUIT_BREAKER_ERROR_CLASSES, RATE_LIMIT_DECREASE_FACTOR,
+                             RATE_LIMIT_INCREASE_PER_SECOND, RATE_LIMIT_MIN_RATE,
+                             RATE_LIMIT_DECREASE_COOLDOWN)
+
+THROTTLING_ERROR_CODES = CIRCUIT_BREAKER_ERROR_CLASSES['throttling']
+
+class TokenBucket:
+    """Thread-safe token bucket allowing `rate` acquisitions per second"""
+
+    def __init__(self, rate: float, burst: float = None):
+        self.rate = rate
+        self.capacity = burst or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = Lock()
+
+    def acquire(self):
+        """Block until a token is available and take it"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class AdaptiveTokenBucket(TokenBucket):
+    """Token bucket whose rate halves on throttling and climbs back linearly (AIMD)"""
+
+    def __init__(self, rate: float, min_rate: float = RATE_LIMIT_MIN_RATE,
+                 decrease_factor: float = RATE_LIMIT_DECREASE_FACTOR,
+                 increase_per_second: float = RATE_LIMIT_INCREASE_PER_SECOND):
+        super().__init__(rate)
+        self.max_rate = rate
+        self.min_rate = min_rate
+        self.decrease_factor = decrease_factor
+        self.increase_per_second = increase_per_second
+        self.calls = 0
+        self.throttles = 0
+        self._last_decrease = 0.0
+        self._last_increase = time.monotonic()
+
+    def acquire(self):
+        super().acquire()
+        with self._lock:
+            self.calls += 1
+
+    def on_throttle(self):
+        with self._lock:
+            self.throttles += 1
+            now = time.monotonic()
+            # Throttled responses to calls that were already in flight only count once
+            if now - self._last_decrease < RATE_LIMIT_DECREASE_COOLDOWN:
+                return
+            self._set_rate(max(self.min_rate, self.rate * self.decrease_factor))
+            self._last_decrease = self._last_increase = now
+
+    def on_success(self):
+        with self._lock:
+            if self.rate >= self.max_rate:
+                return
+            now = time.monotonic()
+            self._set_rate(min(self.max_rate, self.rate + (now - self._last_increase) * self.increase_per_second))
+            self._last_increase = now
+
+    def _set_rate(self, rate: float):
+        self.rate = rate
+        self.capacity = max(1.0, rate)
+        self.tokens = min(self.tokens, self.capacity)
+
+class RateLimiter:
+    """Process-wide adaptive limits per (service, region, operation family), hooked into clients
+
+    The operation family is the verb of the operation name (Describe, List, Get, ...), so
+    read-heavy listing and per-resource lookups are paced separately. Clients attached with a
+    scope (an account ID) get their own buckets, since API limits are per account. Processes
+    that audit the same accounts side by side each take a share of the rates.
+    """
+
+    def __init__(self, rates: Dict[str, Any] = None, share: float = 1.0):
+        self.rates = API_RATE_LIMITS if rates is None else rates
+        self.share = share
+        self._buckets: Dict[Tuple[str, str, str, str], AdaptiveTokenBucket] = {}
+        self._lock = Lock()
+
+    def attach(self, client, region: str, scope: str = None):
+        """Pace every API call the client makes and adapt to its throttling responses"""
+        service = client.meta.service_model.service_name
+        events = client.meta.events
+
+        def before_call(model=None, **kwargs):
+            self.bucket(service, region, model.name, scope).acquire()
+
+        def needs_retry(response=None, operation=None, **kwargs):
+            # Called for every attempt, so throttled attempts botocore retries are seen too
+            if response is not None and operation is not None:
+                code = response[1].get('Error', {}).get('Code')
+                if code in THROTTLING_ERROR_CODES:
+                    self.bucket(service, region, operation.name, scope).on_throttle()
+
+        def after_call(parsed=None, model=None, **kwargs):
+            if model is not None and not (parsed or {}).get('Error'):
+                self.bucket(service, region, model.name, scope).on_success()
+
+        events.register('before-call.*.*', before_call)
+        events.register('needs-retry', needs_retry)
+        events.register('after-call', after_call)
+
+    def bucket(self, service: str, region: str, operation: str, scope: str = None) -> AdaptiveTokenBucket:
+        family = operation_family(operation)
+        key = (scope or '', service, region, family)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            with self._lock:
+                bucket = self._buckets.get(key)
+                if bucket is None:
+                    bucket = AdaptiveTokenBucket(self._rate(service, family))
+                    self._buckets[key] = bucket
+        return bucket
+
+    def metrics(self, scope: str = None) -> List[Dict[str, Any]]:
+        """Current rate and counters of every bucket in the scope, for the run's metrics"""
+        with self._lock:
+            buckets = sorted(item for item in self._buckets.items() if item[0][0] == (scope or ''))
+        return [{
+            'service': service,
+            'region': region,
+            'family': family,
+            'rate': round(bucket.rate, 2),
+            'max_rate': bucket.max_rate,
+            'calls': bucket.calls,
+            'throttles': bucket.throttles
+        } for (_, service, region, family), bucket in buckets]
+
+    def _rate(self, service: str, family: str) -> float:
+        rate = self.rates.get(service, self.rates['default'])
+        if isinstance(rate, dict):
+            rate = rate.get(family, rate.get('default', self.rates['default']))
+        return max(RATE_LIMIT_MIN_RATE, rate * self.share)
+
+def operation_family(operation: str) -> str:
+    """The leading verb of an operation name, e.g. 'List' for ListFunctions"""
+    match = re.match(r'[A-Z][a-z]+', operation)
+    return match.group(0) if match else operation
+
+_shared_limiter = None
+_shared_lock = Lock()
+
+def shared_rate_limiter() -> RateLimiter:
+    """The limiter shared by every client pool in the process"""
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            _shared_limiter = RateLimiter()
+        return _shared_limiter
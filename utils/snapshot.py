@@ -0,0 +1,70 @@
+from typing import Any, Optional
+from threading import Lock
+import json
+import os
+import sqlite3
+import time
+from config.settings import SNAPSHOT_MAX_AGE
+
+class SnapshotStore:
+    """SQLite store of per-resource enrichment data, valid while the resource's change marker is
+    unchanged and the snapshot is younger than max_age seconds"""
+
+    def __init__(self, path: str, commit_every: int = 500, max_age: float = SNAPSHOT_MAX_AGE):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.commit_every = commit_every
+        self.max_age = max_age
+        self._pending = 0
+        self._lock = Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('''
+            CREATE TABLE IF NOT EXISTS snapshots (
+                service TEXT NOT NULL,
+                resource_id TEXT NOT NULL,
+                marker TEXT NOT NULL,
+                data TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (service, resource_id)
+            )
+        ''')
+        self.connection.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, service: str, resource_id: str, marker: Any) -> Optional[Any]:
+        """Return the stored data when the resource's marker matches and it has not expired, otherwise None"""
+        with self._lock:
+            row = self.connection.execute(
+                'SELECT data FROM snapshots WHERE service = ? AND resource_id = ? AND marker = ? '
+                'AND updated_at >= ?',
+                (service, resource_id, self._encode(marker), time.time() - self.max_age)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return json.loads(row[0])
+
+    def put(self, service: str, resource_id: str, marker: Any, data: Any):
+        with self._lock:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO snapshots (service, resource_id, marker, data, updated_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (service, resource_id, self._encode(marker), json.dumps(data, default=str), time.time())
+            )
+            self._pending += 1
+            if self._pending >= self.commit_every:
+                self.connection.commit()
+                self._pending = 0
+
+    def close(self):
+        with self._lock:
+            self.connection.commit()
+            self.connection.close()
+
+    def _encode(self, marker: Any) -> str:
+        return json.dumps(marker, default=str, sort_keys=True)